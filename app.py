@@ -1,13 +1,29 @@
 import json
 from pathlib import Path
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, messagebox
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import sys
 import random
 import math
 import uuid
+import os
+import tempfile
+import threading
+import queue
+import sqlite3
+import csv
+import argparse
+import bisect
+import struct
+import hashlib
+from array import array
+import difflib
+import re
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator
+from urllib.parse import quote, unquote
 
 APP_NAME = "Planner"
 DAILY_GOAL_SECONDS = int(6.5 * 3600)
@@ -33,9 +49,2577 @@ HISTORY_FILE = DATA_DIR / "history.json"
 ENCOURAGEMENTS_FILE = DATA_DIR / "encouragements.json"
 CARDS_DIR = DATA_DIR / "card_pool"
 CARDS_STATE_FILE = DATA_DIR / "cards_state.json"
+THUMB_CACHE_DIR = DATA_DIR / "thumb_cache"
+# Threads decoding Library thumbnails; Pillow releases the GIL while decoding, so a few run in parallel.
+THUMBNAIL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Decoded card images kept in memory, estimated at 4 bytes per pixel; images shown on screen are never evicted.
+CARD_IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+# Box Library thumbnails are scaled into, and the space a card adds around its thumbnail (name, state, padding)
+# when the name fits on one line; names that wrap add their extra lines on top.
+LIBRARY_THUMB_WIDTH = 220
+LIBRARY_THUMB_HEIGHT = 360
+LIBRARY_CARD_CHROME = 84
+LIBRARY_NAME_FONT = ("TkDefaultFont", 10, "bold")
+LIBRARY_NAME_WRAP = LIBRARY_THUMB_WIDTH - 10
+LIBRARY_CARD_GAP = 12
+JOURNAL_FILE = DATA_DIR / "journal.jsonl"
+NOTES_DIR = DATA_DIR / "notes"
+SESSIONS_FILE = DATA_DIR / "sessions.bin"
+SESSION_NAMES_FILE = DATA_DIR / "sessions_names.json"
+# One tracked interval: start and end timestamps plus a 16-byte task key.
+SESSION_RECORD = struct.Struct("<dd16s")
+HOUR_PROFILE_DAYS = 30
+# Every Nth memo revision is stored in full, so rebuilding any revision replays at most N-1 deltas.
+NOTE_KEYFRAME_INTERVAL = 16
+JOURNAL_COMPACT_BYTES = 256 * 1024
+# Snapshot field holding the sequence number of the last journal event folded into that file. It rides on the
+# last task of tasks.json and the latest day of history.json, as an extra field older versions ignore; an empty
+# file carries none, which is safe because replaying any event onto an empty snapshot leaves nothing behind twice.
+JOURNAL_SEQ_KEY = "_journal_seq"
+# Upper bound between timer wake-ups, so a suspended laptop or a wall-clock change is noticed within a minute.
+TIMER_MAX_SLEEP_SECONDS = 60.0
+PERSIST_DEBOUNCE_SECONDS = 0.5
+DB_FILE = DATA_DIR / "planner.db"
+# "json" keeps tasks.json/history.json as the live store; "sqlite" migrates them into planner.db on first start.
+STORAGE_BACKEND = os.environ.get("PLANNER_STORAGE", "json").strip().lower()
+# Above this many visible tasks the list switches to a fixed pool of rows rebound while scrolling.
+VIRTUAL_LIST_THRESHOLD = 150
+# Days fetched per page by the History window; the next page loads when the list is scrolled near its end.
+HISTORY_PAGE_SIZE = 60
 ICON_FILE = Path(__file__).with_name("planner_icon.png")
 
 
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    # Write to a sibling temp file and rename over the target so readers never see a half-written file.
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(str(path.parent), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class PersistenceWriter:
+    def __init__(self, delay: float = PERSIST_DEBOUNCE_SECONDS) -> None:
+        self.delay = delay
+        self._pending: dict[Path, object] = {}
+        self._callbacks: list[Callable[[], None]] = []
+        self._dirty_since: float | None = None
+        self._closed = False
+        self._cond = threading.Condition()
+        # Held while a batch is taken and written, so a synchronous flush can never be overtaken by an older batch.
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="planner-writer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        files: dict[Path, object],
+        on_written: Callable[[], None] | None = None,
+    ) -> None:
+        with self._cond:
+            self._pending.update(files)
+            if on_written is not None:
+                self._callbacks.append(on_written)
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            self._cond.notify()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            self._write_pending()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Let further changes coalesce into the same write until the debounce window passes.
+                deadline = (self._dirty_since or time.monotonic()) + self.delay
+                while not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _write_pending(self) -> None:
+        with self._cond:
+            files = self._pending
+            callbacks = self._callbacks
+            self._pending = {}
+            self._callbacks = []
+            self._dirty_since = None
+        if not files and not callbacks:
+            return
+
+        ok = True
+        for path, payload in files.items():
+            try:
+                atomic_write_text(path, json.dumps(payload, indent=2, ensure_ascii=False))
+            except (OSError, TypeError, ValueError):
+                ok = False
+        if not ok:
+            return
+        for callback in callbacks:
+            try:
+                callback()
+            except OSError:
+                pass
+
+
+class EventJournal:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def append(self, event: dict[str, object]) -> int:
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+                return fh.tell()
+        except OSError:
+            return 0
+
+    def rotated_segments(self) -> list[tuple[int, Path]]:
+        segments: list[tuple[int, Path]] = []
+        try:
+            candidates = list(self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"))
+        except OSError:
+            return []
+        for candidate in candidates:
+            number = candidate.name[len(self.path.stem) + 1 : -len(self.path.suffix)]
+            if number.isdigit():
+                segments.append((int(number), candidate))
+        return sorted(segments)
+
+    def rotate(self) -> int | None:
+        # Seal the live journal as a numbered segment; it is discarded once a snapshot covering it is on disk.
+        if not self.path.exists():
+            return None
+        segments = self.rotated_segments()
+        number = segments[-1][0] + 1 if segments else 1
+        try:
+            self.path.rename(self.path.with_name(f"{self.path.stem}.{number}{self.path.suffix}"))
+        except OSError:
+            return None
+        return number
+
+    def discard(self, upto: int) -> None:
+        for number, segment in self.rotated_segments():
+            if number <= upto:
+                segment.unlink(missing_ok=True)
+
+    def read(self) -> list[dict[str, object]]:
+        paths = [segment for _number, segment in self.rotated_segments()] + [self.path]
+        events: list[dict[str, object]] = []
+        for path in paths:
+            try:
+                raw_lines = path.read_text(encoding="utf-8").splitlines()
+            except OSError:
+                continue
+            for raw_line in raw_lines:
+                if not raw_line.strip():
+                    continue
+                try:
+                    event = json.loads(raw_line)
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave a partial last line; everything before it is still valid.
+                    continue
+                if isinstance(event, dict) and isinstance(event.get("event"), str):
+                    events.append(event)
+        return events
+
+    def clear(self) -> None:
+        for path in [segment for _number, segment in self.rotated_segments()] + [self.path]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                try:
+                    path.write_text("", encoding="utf-8")
+                except OSError:
+                    pass
+
+
+def journal_watermark(value: object) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) and value > 0 else 0
+
+
+def read_json_file(path: Path) -> object:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def derived_task_id(text: str, occurrence: int) -> str:
+    # Stable id for an imported task that has none: its title plus how many id-less tasks with the same title
+    # came before it in that file, so re-importing the file matches the same tasks and two "Read" items stay two.
+    return hashlib.blake2b(f"{occurrence}:{text.strip()}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def session_task_key(task_id: str) -> bytes:
+    # Task ids are uuid4 hex, which fit the 16-byte slot as-is; anything else (legacy ids) is hashed.
+    try:
+        key = bytes.fromhex(task_id)
+    except ValueError:
+        key = b""
+    return key if len(key) == 16 else hashlib.blake2b(task_id.encode("utf-8"), digest_size=16).digest()
+
+
+class SessionLog:
+    # Append-only log of every tracked interval as fixed-width binary records, so a pause costs one small
+    # append and readers can stream the file or seek straight to record N. Task names sit in a small side
+    # map keyed by task key, so sessions of renamed or deleted tasks stay attributable; it is rewritten by a
+    # background writer, started on the first new name.
+
+    def __init__(self, path: Path, names_path: Path) -> None:
+        self.path = path
+        self.names_path = names_path
+        raw = read_json_file(names_path)
+        self.names: dict[str, str] = {str(k): str(v) for k, v in raw.items()} if isinstance(raw, dict) else {}
+        self.writer: PersistenceWriter | None = None
+
+    def __len__(self) -> int:
+        try:
+            return self.path.stat().st_size // SESSION_RECORD.size
+        except OSError:
+            return 0
+
+    def append(self, start_ts: float, end_ts: float, task_id: str, task_text: str) -> None:
+        self.extend([(start_ts, end_ts, task_id, task_text)])
+
+    def extend(self, sessions: list[tuple[float, float, str, str]]) -> None:
+        records = bytearray()
+        names_changed = False
+        for start_ts, end_ts, task_id, task_text in sessions:
+            key = session_task_key(task_id)
+            records += SESSION_RECORD.pack(start_ts, end_ts, key)
+            if self.names.get(key.hex()) != task_text:
+                self.names[key.hex()] = task_text
+                names_changed = True
+        try:
+            with self.path.open("ab") as fh:
+                # A crash mid-append can leave a torn record; pad it out so later records stay aligned.
+                torn = fh.tell() % SESSION_RECORD.size
+                if torn:
+                    fh.write(b"\0" * (SESSION_RECORD.size - torn))
+                fh.write(records)
+        except OSError:
+            pass
+        if names_changed:
+            self.save_names()
+
+    def save_names(self) -> None:
+        if self.writer is None:
+            self.writer = PersistenceWriter()
+        self.writer.submit({self.names_path: dict(self.names)})
+
+    def replace(self, source_dir: Path | None) -> None:
+        # Swaps in the log exported alongside an imported history, or starts an empty one when there is none,
+        # so sessions of replaced history cannot resurface in a later export or merge.
+        data = b""
+        names: dict[str, str] = {}
+        if source_dir is not None:
+            other = SessionLog(source_dir / self.path.name, source_dir / self.names_path.name)
+            try:
+                data = other.path.read_bytes()
+            except OSError:
+                data = b""
+            data = data[: len(data) - len(data) % SESSION_RECORD.size]
+            names = other.names if data else {}
+        try:
+            atomic_write_bytes(self.path, data)
+        except OSError:
+            return
+        self.names = names
+        self.save_names()
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+    def iter_sessions(self, first: int = 0, chunk_records: int = 4096) -> Iterator[tuple[float, float, str]]:
+        # Yields (start, end, task key hex) in append order, reading the file in fixed-size chunks.
+        try:
+            fh = self.path.open("rb")
+        except OSError:
+            return
+        with fh:
+            fh.seek(first * SESSION_RECORD.size)
+            while True:
+                chunk = fh.read(chunk_records * SESSION_RECORD.size)
+                usable = len(chunk) - len(chunk) % SESSION_RECORD.size
+                for start_ts, end_ts, key in SESSION_RECORD.iter_unpack(chunk[:usable]):
+                    # Padding after a torn record reads back as an empty interval.
+                    if 0 < start_ts < end_ts:
+                        yield start_ts, end_ts, key.hex()
+                if len(chunk) < chunk_records * SESSION_RECORD.size:
+                    return
+
+    def task_name(self, key_hex: str) -> str:
+        return self.names.get(key_hex, "Untitled Task")
+
+
+class SessionIndex:
+    # Sorted start and end arrays with prefix sums over recorded sessions. The time tracked inside [a, b) is
+    # sum(clip(end)) - sum(clip(start)) with clip(x) = min(max(x, a), b), and each of those sums is two
+    # bisects plus prefix-sum lookups, so overlap queries are O(log n). For stabbing queries sessions are also
+    # bucketed by duration class: bucket e holds durations in [2^(e-1), 2^e), so only sessions starting within
+    # 2^e before the probe can contain it, and every one starting in the later half of that window does.
+
+    def __init__(self) -> None:
+        self.starts = array("d")
+        self.start_prefix = array("d", [0.0])
+        self.ends = array("d")
+        self.end_prefix = array("d", [0.0])
+        # Duration exponent -> (starts, ends, keys), ordered by start.
+        self.buckets: dict[int, tuple[array, array, list[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[tuple[float, float, str]]) -> "SessionIndex":
+        # Bulk build: one sort, then every array is filled in a single pass.
+        index = cls()
+        ordered = sorted((s for s in sessions if s[1] > s[0]), key=lambda s: s[0])
+        for start_ts, end_ts, key in ordered:
+            index.starts.append(start_ts)
+            index.start_prefix.append(index.start_prefix[-1] + start_ts)
+            starts, ends, keys = index.bucket_for(start_ts, end_ts)
+            starts.append(start_ts)
+            ends.append(end_ts)
+            keys.append(key)
+        for end_ts in sorted(end_ts for _start, end_ts, _key in ordered):
+            index.ends.append(end_ts)
+            index.end_prefix.append(index.end_prefix[-1] + end_ts)
+        return index
+
+    def bucket_for(self, start_ts: float, end_ts: float) -> tuple[array, array, list[str]]:
+        exponent = math.frexp(end_ts - start_ts)[1]
+        if exponent not in self.buckets:
+            self.buckets[exponent] = (array("d"), array("d"), [])
+        return self.buckets[exponent]
+
+    def add(self, start_ts: float, end_ts: float, key: str) -> None:
+        # Live pauses arrive in time order, so every insert is normally an append. Bulk input goes through
+        # from_sessions instead.
+        if end_ts <= start_ts:
+            return
+        pos = bisect.bisect_right(self.starts, start_ts)
+        self.starts.insert(pos, start_ts)
+        self.insert_prefix(self.start_prefix, pos, start_ts)
+        pos = bisect.bisect_right(self.ends, end_ts)
+        self.ends.insert(pos, end_ts)
+        self.insert_prefix(self.end_prefix, pos, end_ts)
+        starts, ends, keys = self.bucket_for(start_ts, end_ts)
+        pos = bisect.bisect_right(starts, start_ts)
+        starts.insert(pos, start_ts)
+        ends.insert(pos, end_ts)
+        keys.insert(pos, key)
+
+    @staticmethod
+    def insert_prefix(prefix: array, pos: int, value: float) -> None:
+        prefix.insert(pos + 1, prefix[pos] + value)
+        for i in range(pos + 2, len(prefix)):
+            prefix[i] += value
+
+    @staticmethod
+    def clipped_sum(values: array, prefix: array, lo: float, hi: float) -> float:
+        below = bisect.bisect_left(values, lo)
+        above = bisect.bisect_right(values, hi)
+        inside = prefix[above] - prefix[below]
+        return below * lo + inside + (len(values) - above) * hi
+
+    def overlap_seconds(self, lo: float, hi: float) -> float:
+        if hi <= lo or not self.starts:
+            return 0.0
+        return self.clipped_sum(self.ends, self.end_prefix, lo, hi) - self.clipped_sum(
+            self.starts, self.start_prefix, lo, hi
+        )
+
+    def stab(self, ts: float) -> list[tuple[float, float, str]]:
+        found: list[tuple[float, float, str]] = []
+        for exponent, (starts, ends, keys) in self.buckets.items():
+            first = bisect.bisect_left(starts, ts - math.ldexp(1.0, exponent))
+            last = bisect.bisect_right(starts, ts)
+            found.extend((starts[i], ends[i], keys[i]) for i in range(first, last) if ends[i] > ts)
+        found.sort()
+        return found
+
+
+class Task:
+    # One planner task. Fields are validated once when a task enters the store (from_dict / the constructor), so
+    # the per-second timer paths can read them directly without re-coercing on every tick.
+    # Memo text is not part of the task; it lives in the storage note store and is read only when opened.
+    __slots__ = ("id", "text", "done", "elapsed_seconds", "started_at", "running")
+
+    def __init__(
+        self,
+        task_id: str,
+        text: str,
+        done: bool = False,
+        elapsed_seconds: float = 0.0,
+        started_at: float | None = None,
+        running: bool = False,
+    ) -> None:
+        self.id = task_id
+        self.text = text
+        self.done = done
+        self.elapsed_seconds = elapsed_seconds
+        self.started_at = started_at
+        self.running = running
+
+    @classmethod
+    def from_dict(cls, item: object, task_id: str, now_ts: float) -> "Task | None":
+        if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+            return None
+        txt = item["text"].strip()
+        if not txt:
+            return None
+
+        done = bool(item.get("done", False))
+        elapsed_raw = item.get("elapsed_seconds", 0)
+        started_raw = item.get("started_at")
+        running_raw = item.get("running", False)
+
+        elapsed_seconds = float(elapsed_raw) if isinstance(elapsed_raw, (int, float)) else 0.0
+        running = bool(running_raw) and not done
+        started_at: float | None = None
+        if running and isinstance(started_raw, (int, float)):
+            started_at = float(started_raw)
+        elif isinstance(started_raw, (int, float)) and not done:
+            # Backward compatible: old data may store active start time without explicit running flag.
+            # Convert it to paused + accumulated elapsed time to avoid auto-running after startup.
+            elapsed_seconds += max(0, now_ts - float(started_raw))
+            started_at = None
+        if running and started_at is None:
+            running = False
+        return cls(task_id, txt, done, elapsed_seconds, started_at, running)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "done": self.done,
+            "elapsed_seconds": self.elapsed_seconds,
+            "started_at": self.started_at,
+            "running": self.running,
+        }
+
+
+def clean_tasks(raw: object, notes: dict[str, str] | None = None) -> list[Task]:
+    # Inline memos (older tasks.json files and exports) are collected into `notes`, keyed by the final task id.
+    if not isinstance(raw, list):
+        return []
+
+    cleaned: list[Task] = []
+    used_ids: set[str] = set()
+    now_ts = time.time()
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        raw_id = item.get("id")
+        task_id = str(raw_id).strip() if isinstance(raw_id, str) else ""
+        if not task_id or task_id in used_ids:
+            task_id = uuid.uuid4().hex
+        task = Task.from_dict(item, task_id, now_ts)
+        if task is not None:
+            used_ids.add(task_id)
+            cleaned.append(task)
+            raw_note = item.get("note")
+            if notes is not None and isinstance(raw_note, str) and raw_note.strip():
+                notes[task_id] = raw_note
+    return cleaned
+
+
+def split_interval_by_day(start_ts: float, end_ts: float) -> list[tuple[str, float]]:
+    # Seconds of [start_ts, end_ts) per local day. Elapsed time, not wall-clock difference, so a day with a
+    # DST change counts its real 23 or 25 hours, the same as bulk splits through DayBoundaries.
+    if end_ts <= start_ts:
+        return []
+    return list(DayBoundaries(start_ts, end_ts).split(start_ts, end_ts))
+
+
+class DayBoundaries:
+    # Local midnights covering a time span, computed once per day (DST-aware) so that splitting many intervals
+    # costs a bisect per interval instead of datetime arithmetic for every one of them. The only day splitter:
+    # split_interval_by_day uses it too, so live pauses and bulk imports always agree.
+
+    def __init__(self, first_ts: float, last_ts: float) -> None:
+        day = datetime.fromtimestamp(first_ts).date()
+        last_day = datetime.fromtimestamp(last_ts).date() + timedelta(days=1)
+        self.keys: list[str] = []
+        self.midnights = array("d")
+        while day <= last_day:
+            self.keys.append(day.isoformat())
+            self.midnights.append(datetime.combine(day, datetime.min.time()).timestamp())
+            day += timedelta(days=1)
+
+    def split(self, start_ts: float, end_ts: float) -> Iterator[tuple[str, float]]:
+        i = bisect.bisect_right(self.midnights, start_ts) - 1
+        while start_ts < end_ts and 0 <= i < len(self.keys) - 1:
+            segment_end = min(self.midnights[i + 1], end_ts)
+            yield self.keys[i], segment_end - start_ts
+            start_ts = segment_end
+            i += 1
+
+
+def aggregate_intervals(intervals: list[tuple[float, float, str]]) -> dict[tuple[str, str], float]:
+    # Sums a batch of (start, end, task) intervals into per-(day, task) seconds.
+    totals: dict[tuple[str, str], float] = {}
+    valid = [(start_ts, end_ts, task_text) for start_ts, end_ts, task_text in intervals if end_ts > start_ts]
+    if not valid:
+        return totals
+    days = DayBoundaries(min(start_ts for start_ts, _e, _t in valid), max(end_ts for _s, end_ts, _t in valid))
+    for start_ts, end_ts, task_text in valid:
+        for date_key, seconds in days.split(start_ts, end_ts):
+            key = (date_key, task_text)
+            totals[key] = totals.get(key, 0.0) + seconds
+    return totals
+
+
+def parse_timestamp(value: object) -> float | None:
+    # Unix seconds (number or numeric string) or an ISO 8601 date-time in local time.
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        return None
+
+
+def read_interval_file(path: Path) -> tuple[list[tuple[float, float, str]], int]:
+    # CSV with start,end,task columns or JSON lines with the same keys. Returns the intervals and how many
+    # rows were skipped as unreadable.
+    intervals: list[tuple[float, float, str]] = []
+    skipped = 0
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        if path.suffix.lower() == ".csv":
+            rows: Iterable[object] = csv.DictReader(fh)
+        else:
+            rows = (line for line in fh if line.strip())
+        for row in rows:
+            if isinstance(row, str):
+                try:
+                    row = json.loads(row)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+            if not isinstance(row, dict):
+                skipped += 1
+                continue
+            start_ts = parse_timestamp(row.get("start"))
+            end_ts = parse_timestamp(row.get("end"))
+            task_text = str(row.get("task") or "").strip() or "Untitled Task"
+            if start_ts is None or end_ts is None or end_ts <= start_ts:
+                skipped += 1
+                continue
+            intervals.append((start_ts, end_ts, task_text))
+    return intervals, skipped
+
+
+class JsonStreamReader:
+    # Decodes the members of a top-level JSON array or object one at a time from a text stream, so memory is
+    # bounded by the largest single member (one task, one day of history) rather than by the whole file.
+
+    def __init__(self, fh: object, chunk_size: int = 64 * 1024) -> None:
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.chars_read = 0
+
+    def fill(self) -> bool:
+        chunk = self.fh.read(self.chunk_size)  # type: ignore[attr-defined]
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        self.chars_read += len(chunk)
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expected one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self) -> object:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the member continues in the next chunk.
+                if not self.fill():
+                    raise
+                continue
+            # A number cut off by the chunk edge ("12" of "125", "2.5" of "2.5e3") continues in the next chunk.
+            if isinstance(value, (int, float)) and not self.buf[end:].strip("0123456789.eE+-") and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator[tuple[str | None, object]]:
+        # Yields (key, value) for an object and (None, value) for an array.
+        opener = self.expect("[{")
+        closer = "]" if opener == "[" else "}"
+        if self.peek() == closer:
+            self.pos += 1
+            return
+        while True:
+            key: str | None = None
+            if opener == "{":
+                raw_key = self.decode()
+                if not isinstance(raw_key, str):
+                    raise json.JSONDecodeError("Expected a string key", self.buf, self.pos)
+                key = raw_key
+                self.expect(":")
+            yield key, self.decode()
+            if self.expect("," + closer) == closer:
+                return
+
+
+def scan_merge_sources(
+    src_tasks: Path | None,
+    src_history: Path | None,
+    known_ids: set[str],
+    report: Callable[[float], None],
+) -> tuple[dict[tuple[str, str], float], list[dict[str, object]]]:
+    # Streams an exported tasks.json/history.json pair for merging: per-(day, task) seconds summed across the
+    # source, and the source tasks whose id is not known locally (first occurrence wins within the source).
+    # Tasks without an id get a derived_task_id, so merging the same file again adds nothing.
+    # Runs off the UI thread; `report` receives overall progress as a 0..1 fraction.
+    sources = [path for path in (src_tasks, src_history) if path is not None]
+    total_size = max(1, sum(path.stat().st_size for path in sources))
+    done_size = 0
+    rows: dict[tuple[str, str], float] = {}
+    new_tasks: list[dict[str, object]] = []
+    seen_ids = set(known_ids)
+    # Id-less tasks seen so far in the source, per title.
+    unkeyed_counts: dict[str, int] = {}
+
+    for path in sources:
+        with path.open("r", encoding="utf-8") as fh:
+            reader = JsonStreamReader(fh)
+            last_reported = -1.0
+            for key, value in reader.items():
+                if path == src_history:
+                    if key is not None and isinstance(value, dict):
+                        merge_history_day(rows, key, value)
+                elif isinstance(value, dict) and isinstance(value.get("text"), str) and value["text"].strip():
+                    raw_id = value.get("id")
+                    if not (isinstance(raw_id, str) and raw_id.strip()):
+                        text = value["text"].strip()
+                        raw_id = derived_task_id(text, unkeyed_counts.get(text, 0))
+                        unkeyed_counts[text] = unkeyed_counts.get(text, 0) + 1
+                        value = {**value, "id": raw_id}
+                    if raw_id.strip() in seen_ids:
+                        continue
+                    seen_ids.add(raw_id.strip())
+                    new_tasks.append(value)
+                fraction = min(1.0, (done_size + reader.chars_read) / total_size)
+                if fraction - last_reported >= 0.01:
+                    last_reported = fraction
+                    report(fraction)
+        done_size += path.stat().st_size
+    report(1.0)
+    return rows, new_tasks
+
+
+def merge_history_day(rows: dict[tuple[str, str], float], date_key: str, day: dict[str, object]) -> None:
+    tasks = day.get("tasks")
+    task_sum = 0.0
+    if isinstance(tasks, dict):
+        for task_text, seconds in tasks.items():
+            if isinstance(seconds, (int, float)) and seconds > 0:
+                rows[(date_key, str(task_text))] = rows.get((date_key, str(task_text)), 0.0) + float(seconds)
+                task_sum += float(seconds)
+    total = day.get("total_seconds")
+    # Keep time that the source day has in its total but not in any task breakdown.
+    if isinstance(total, (int, float)) and total - task_sum > 1e-6:
+        rows[(date_key, "Untitled Task")] = rows.get((date_key, "Untitled Task"), 0.0) + float(total) - task_sum
+
+
+def read_export_history_rows(path: Path) -> dict[tuple[str, str], float]:
+    rows: dict[tuple[str, str], float] = {}
+    if not path.exists():
+        return rows
+    with path.open("r", encoding="utf-8") as fh:
+        for key, value in JsonStreamReader(fh).items():
+            if key is not None and isinstance(value, dict):
+                merge_history_day(rows, key, value)
+    return rows
+
+
+def union_sessions(sessions: list[tuple[float, float, str]]) -> list[tuple[float, float, str]]:
+    # Per task key, merges overlapping or touching intervals so time recorded on several exports counts once.
+    merged: list[tuple[float, float, str]] = []
+    for start_ts, end_ts, key in sorted(sessions, key=lambda item: (item[2], item[0], item[1])):
+        if merged and merged[-1][2] == key and start_ts <= merged[-1][1]:
+            last_start, last_end, _key = merged[-1]
+            merged[-1] = (last_start, max(last_end, end_ts), key)
+        else:
+            merged.append((start_ts, end_ts, key))
+    return merged
+
+
+def history_contains(outer: dict[tuple[str, str], float], inner: dict[tuple[str, str], float]) -> bool:
+    # True when `inner` is provably an earlier copy of `outer`: every (day, task) row is identical, except that
+    # rows on inner's latest day may have grown since (the day was still being tracked when inner was exported).
+    # That exception needs at least one identical earlier day as evidence; a lone day must match exactly.
+    if not inner:
+        return False
+    last_day = max(date_key for date_key, _task in inner)
+    has_earlier = False
+    for row_key, seconds in inner.items():
+        other = outer.get(row_key)
+        if other is None:
+            return False
+        if row_key[0] != last_day:
+            if other != seconds:
+                return False
+            has_earlier = True
+        elif other < seconds:
+            return False
+    return has_earlier or all(outer[row_key] == seconds for row_key, seconds in inner.items())
+
+
+def merge_exports(
+    sources: list[Path],
+) -> tuple[
+    list[dict[str, object]],
+    dict[str, dict[str, object]],
+    list[tuple[float, float, str]],
+    dict[str, str],
+    list[tuple[Path, Path, str, str, float]],
+]:
+    # Consolidates N export folders (tasks.json, history.json and, when present, sessions.bin) into one dataset:
+    # - tasks are reconciled by id (a derived_task_id for tasks that have none); the copy with the most tracked
+    #   time wins, ties go to the earlier source;
+    # - per (day, task), time backed by session intervals is taken from the union of all sources' intervals,
+    #   and the remaining history-only time is summed over sources, except that a source whose history-only rows
+    #   are contained in another source's (history_contains, e.g. an older export of the same machine) is left
+    #   out. Those rows come back as (source, containing source, day, task, seconds) so callers can report them.
+    # Sources are processed in sorted path order, which makes the result independent of argument order.
+    sources = sorted(sources, key=lambda path: str(path.resolve()))
+    source_rests: list[dict[tuple[str, str], float]] = []
+    all_sessions: list[tuple[float, float, str]] = []
+    names: dict[str, str] = {}
+    tasks_by_id: dict[str, dict[str, object]] = {}
+    task_order: list[str] = []
+
+    for source in sources:
+        log = SessionLog(source / SESSIONS_FILE.name, source / SESSION_NAMES_FILE.name)
+        sessions = list(log.iter_sessions())
+        for key, name in log.names.items():
+            names.setdefault(key, name)
+        all_sessions.extend(sessions)
+        covered = aggregate_intervals([(start_ts, end_ts, log.task_name(key)) for start_ts, end_ts, key in sessions])
+
+        rests: dict[tuple[str, str], float] = {}
+        for row_key, seconds in read_export_history_rows(source / HISTORY_FILE.name).items():
+            rest = round(seconds - covered.get(row_key, 0.0), 6)
+            if rest > 0:
+                rests[row_key] = rest
+        source_rests.append(rests)
+
+        raw_tasks = read_json_file(source / DATA_FILE.name)
+        unkeyed_counts: dict[str, int] = {}
+        for item in raw_tasks if isinstance(raw_tasks, list) else []:
+            if not isinstance(item, dict) or not isinstance(item.get("text"), str) or not item["text"].strip():
+                continue
+            # A live tasks.json marks its journal watermark on a task; it must not travel with the merged copy.
+            item = {field: value for field, value in item.items() if field != JOURNAL_SEQ_KEY}
+            raw_id = item.get("id")
+            task_id = raw_id.strip() if isinstance(raw_id, str) else ""
+            if not task_id:
+                text = item["text"].strip()
+                task_id = derived_task_id(text, unkeyed_counts.get(text, 0))
+                unkeyed_counts[text] = unkeyed_counts.get(text, 0) + 1
+                item["id"] = task_id
+            current = tasks_by_id.get(task_id)
+            if current is None:
+                task_order.append(task_id)
+                tasks_by_id[task_id] = item
+                continue
+            elapsed = item.get("elapsed_seconds")
+            current_elapsed = current.get("elapsed_seconds")
+            if isinstance(elapsed, (int, float)) and (
+                not isinstance(current_elapsed, (int, float)) or elapsed > current_elapsed
+            ):
+                tasks_by_id[task_id] = item
+
+    totals = aggregate_intervals(
+        [(start_ts, end_ts, names.get(key, "Untitled Task")) for start_ts, end_ts, key in union_sessions(all_sessions)]
+    )
+    collapsed: list[tuple[Path, Path, str, str, float]] = []
+    for i, rests in enumerate(source_rests):
+        # Of two identical histories the one from the earlier source is kept.
+        container = next(
+            (
+                j
+                for j, outer in enumerate(source_rests)
+                if j != i and history_contains(outer, rests) and not (j > i and history_contains(rests, outer))
+            ),
+            None,
+        )
+        if container is not None:
+            for (date_key, task_text), rest in sorted(rests.items()):
+                collapsed.append((sources[i], sources[container], date_key, task_text, rest))
+            continue
+        for row_key, rest in rests.items():
+            totals[row_key] = totals.get(row_key, 0.0) + rest
+
+    history: dict[str, dict[str, object]] = {}
+    for (date_key, task_text), seconds in sorted(totals.items()):
+        day = history.setdefault(date_key, {"total_seconds": 0.0, "tasks": {}})
+        day["total_seconds"] = float(day["total_seconds"]) + seconds  # type: ignore[arg-type]
+        day["tasks"][task_text] = seconds  # type: ignore[index]
+
+    notes: dict[str, str] = {}
+    merged_tasks = clean_tasks([tasks_by_id[task_id] for task_id in task_order], notes)
+    task_dicts: list[dict[str, object]] = []
+    for task in merged_tasks:
+        # A timer left running on one machine has no meaning in the merged data.
+        task.running = False
+        task.started_at = None
+        task_dict = task.to_dict()
+        if task.id in notes:
+            task_dict["note"] = notes[task.id]
+        task_dicts.append(task_dict)
+    return task_dicts, history, sorted(set(all_sessions)), names, collapsed
+
+
+def is_planner_data_folder(path: Path) -> bool:
+    # A live data folder keeps memos in notes/ and recent changes in the journal (or in planner.db), none of which
+    # merge_exports reads; only an export has everything in tasks.json/history.json.
+    return (
+        (path / JOURNAL_FILE.name).exists()
+        or any(path.glob(f"{JOURNAL_FILE.stem}.*{JOURNAL_FILE.suffix}"))
+        or (path / NOTES_DIR.name).is_dir()
+        or (path / DB_FILE.name).exists()
+    )
+
+
+def merge_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="app.py merge",
+        description="Merge several exported tasks.json/history.json folders into one consolidated export.",
+    )
+    parser.add_argument("--out", required=True, type=Path, help="folder to write the merged files to")
+    parser.add_argument("exports", nargs="+", type=Path, help="folders written by Export Data")
+    args = parser.parse_args(argv)
+
+    missing = [str(path) for path in args.exports if not path.is_dir()]
+    if missing:
+        parser.error(f"not a folder: {', '.join(missing)}")
+    live = [str(path) for path in args.exports if is_planner_data_folder(path)]
+    if live:
+        parser.error(f"planner data folder, use Export Data on that machine first: {', '.join(live)}")
+    try:
+        tasks, history, sessions, names, collapsed = merge_exports(args.exports)
+        args.out.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(args.out / DATA_FILE.name, json.dumps(tasks, indent=2, ensure_ascii=False))
+        atomic_write_text(args.out / HISTORY_FILE.name, json.dumps(history, indent=2, ensure_ascii=False))
+        if sessions:
+            records = b"".join(
+                SESSION_RECORD.pack(start_ts, end_ts, bytes.fromhex(key)) for start_ts, end_ts, key in sessions
+            )
+            atomic_write_bytes(args.out / SESSIONS_FILE.name, records)
+            atomic_write_text(args.out / SESSION_NAMES_FILE.name, json.dumps(names, indent=2, ensure_ascii=False))
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as exc:
+        print(f"Merge failed: {exc}", file=sys.stderr)
+        return 1
+    for source, container, date_key, task_text, seconds in collapsed:
+        print(
+            f"Not counted twice: {date_key} {task_text} {FloatingTaskWidget.format_seconds(seconds)}"
+            f" from {source} (already in {container})"
+        )
+    print(f"Merged {len(args.exports)} exports: {len(tasks)} tasks, {len(history)} days -> {args.out}")
+    return 0
+
+
+def split_note_tokens(text: str) -> list[str]:
+    # Words with their trailing whitespace; joining the tokens gives back the exact text.
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def note_delta(old: str, new: str) -> list[object]:
+    # Edit script against the previous revision: [start, end] copies old tokens, a string inserts new text.
+    old_tokens = split_note_tokens(old)
+    new_tokens = split_note_tokens(new)
+    delta: list[object] = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append("".join(new_tokens[j1:j2]))
+    return delta
+
+
+def apply_note_delta(old: str, delta: object) -> str:
+    if not isinstance(delta, list):
+        return old
+    old_tokens = split_note_tokens(old)
+    parts: list[str] = []
+    for op in delta:
+        if isinstance(op, str):
+            parts.append(op)
+        elif isinstance(op, list) and len(op) == 2 and all(isinstance(x, int) for x in op):
+            parts.extend(old_tokens[op[0] : op[1]])
+    return "".join(parts)
+
+
+def note_revision_body(rev: int, old: str, new: str) -> tuple[str | None, list[object] | None]:
+    # Returns (keyframe text, delta); exactly one of them is set.
+    if rev % NOTE_KEYFRAME_INTERVAL == 0:
+        return new, None
+    delta = note_delta(old, new)
+    if len(json.dumps(delta, ensure_ascii=False, separators=(",", ":"))) >= len(new):
+        return new, None
+    return None, delta
+
+
+def replay_note_revisions(bodies: Iterable[tuple[str | None, object]]) -> str:
+    # Bodies must start at a keyframe.
+    text = ""
+    for keyframe, delta in bodies:
+        text = keyframe if keyframe is not None else apply_note_delta(text, delta)
+    return text
+
+
+class TaskStore:
+    # Tasks indexed by id, kept in display order through a doubly linked id sequence. Lookup, append,
+    # removal and moving a task next to another are all O(1); iteration walks the links in order.
+
+    def __init__(self, tasks: list[Task] | None = None) -> None:
+        self._tasks: dict[str, Task] = {}
+        self._prev: dict[str, str | None] = {}
+        self._next: dict[str, str | None] = {}
+        self._head: str | None = None
+        self._tail: str | None = None
+        for task in tasks or []:
+            self.append(task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._tasks
+
+    def __iter__(self) -> Iterator[Task]:
+        task_id = self._head
+        while task_id is not None:
+            nxt = self._next[task_id]
+            yield self._tasks[task_id]
+            task_id = nxt
+
+    def get(self, task_id: str) -> Task | None:
+        return self._tasks.get(task_id)
+
+    def ids(self) -> list[str]:
+        return [task.id for task in self]
+
+    def append(self, task: Task) -> None:
+        self.insert_before(task, None)
+
+    def insert_before(self, task: Task, before_id: str | None) -> None:
+        task_id = task.id
+        if task_id in self._tasks:
+            raise ValueError(f"Duplicate task id: {task_id}")
+        self._tasks[task_id] = task
+        self._link(task_id, before_id)
+
+    def remove(self, task_id: str) -> Task:
+        task = self._tasks.pop(task_id)
+        self._unlink(task_id)
+        return task
+
+    def move_before(self, task_id: str, before_id: str | None) -> None:
+        if task_id == before_id or task_id not in self._tasks:
+            return
+        self._unlink(task_id)
+        self._link(task_id, before_id)
+
+    def _link(self, task_id: str, before_id: str | None) -> None:
+        if before_id is None or before_id not in self._tasks:
+            prev_id = self._tail
+            next_id = None
+        else:
+            prev_id = self._prev[before_id]
+            next_id = before_id
+        self._prev[task_id] = prev_id
+        self._next[task_id] = next_id
+        if prev_id is None:
+            self._head = task_id
+        else:
+            self._next[prev_id] = task_id
+        if next_id is None:
+            self._tail = task_id
+        else:
+            self._prev[next_id] = task_id
+
+    def _unlink(self, task_id: str) -> None:
+        prev_id = self._prev.pop(task_id)
+        next_id = self._next.pop(task_id)
+        if prev_id is None:
+            self._head = next_id
+        else:
+            self._next[prev_id] = next_id
+        if next_id is None:
+            self._tail = prev_id
+        else:
+            self._prev[next_id] = prev_id
+
+
+class HistoryAnalytics:
+    # Contiguous day-indexed series over the history: seconds[i] is the time tracked on origin + i days.
+    # Prefix sums of seconds and of ★ days make range totals and ★ counts O(1), and runs[i] (length of the
+    # ★ streak ending on day i) makes streaks O(1). add() keeps everything current; since a day only ever
+    # grows, an update touches only the days after it, which for today's time is none.
+
+    def __init__(self) -> None:
+        self.origin: date | None = None
+        self.seconds = array("d")
+        self.prefix = array("d", [0.0])
+        self.goal_prefix = array("l", [0])
+        self.runs = array("l")
+        self.longest_streak = 0
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def rebuild(self, days: Iterable[tuple[str, float]]) -> None:
+        totals: dict[date, float] = {}
+        for date_key, seconds in days:
+            try:
+                day = date.fromisoformat(date_key)
+            except ValueError:
+                continue
+            totals[day] = totals.get(day, 0.0) + float(seconds)
+        self.origin = min(totals) if totals else None
+        self.seconds = array("d", [0.0] * (((max(totals) - self.origin).days + 1) if self.origin else 0))
+        for day, seconds in totals.items():
+            self.seconds[(day - self.origin).days] = seconds
+        self.recompute(0)
+
+    def recompute(self, start: int) -> None:
+        # Re-derives prefix sums and streak runs from index `start` on.
+        n = len(self.seconds)
+        del self.prefix[start + 1 :]
+        del self.goal_prefix[start + 1 :]
+        del self.runs[start:]
+        for i in range(start, n):
+            value = self.seconds[i]
+            hit = value >= DAILY_GOAL_SECONDS
+            self.prefix.append(self.prefix[i] + value)
+            self.goal_prefix.append(self.goal_prefix[i] + int(hit))
+            self.runs.append((self.runs[i - 1] + 1 if i > 0 else 1) if hit else 0)
+        tail_best = max(self.runs[start:], default=0)
+        self.longest_streak = tail_best if start == 0 else max(self.longest_streak, tail_best)
+
+    def index_of(self, date_key: str) -> int | None:
+        if self.origin is None:
+            return None
+        try:
+            return (date.fromisoformat(date_key) - self.origin).days
+        except ValueError:
+            return None
+
+    def add(self, date_key: str, seconds: float) -> None:
+        try:
+            day = date.fromisoformat(date_key)
+        except ValueError:
+            return
+        if self.origin is None:
+            self.origin = day
+        if day < self.origin:
+            pad = (self.origin - day).days
+            self.seconds = array("d", [0.0] * pad) + self.seconds
+            self.origin = day
+            self.recompute(0)
+        i = (day - self.origin).days
+        if i >= len(self.seconds):
+            first_new = len(self.seconds)
+            self.seconds.extend([0.0] * (i + 1 - first_new))
+            self.recompute(first_new)
+        was_hit = self.seconds[i] >= DAILY_GOAL_SECONDS
+        self.seconds[i] += seconds
+        for j in range(i + 1, len(self.prefix)):
+            self.prefix[j] += seconds
+        if was_hit or self.seconds[i] < DAILY_GOAL_SECONDS:
+            return
+        # Day i just became a ★ day: it extends the streak before it and joins the ★ days right after it.
+        for j in range(i + 1, len(self.goal_prefix)):
+            self.goal_prefix[j] += 1
+        j = i
+        while j < len(self.seconds) and (j == i or self.seconds[j] >= DAILY_GOAL_SECONDS):
+            self.runs[j] = self.runs[j - 1] + 1 if j > 0 else 1
+            j += 1
+        self.longest_streak = max(self.longest_streak, self.runs[j - 1])
+
+    def clamp(self, start_key: str | None, end_key: str | None) -> tuple[int, int]:
+        # Half-open index range [lo, hi) covering start_key..end_key (inclusive dates), clipped to the series.
+        n = len(self.seconds)
+        lo = self.index_of(start_key) if start_key else 0
+        hi = self.index_of(end_key) if end_key else n - 1
+        if lo is None or hi is None:
+            return 0, 0
+        return max(0, lo), min(n, hi + 1)
+
+    def range_total(self, start_key: str | None = None, end_key: str | None = None) -> float:
+        lo, hi = self.clamp(start_key, end_key)
+        return self.prefix[hi] - self.prefix[lo] if hi > lo else 0.0
+
+    def goal_days(self, start_key: str | None = None, end_key: str | None = None) -> int:
+        lo, hi = self.clamp(start_key, end_key)
+        return self.goal_prefix[hi] - self.goal_prefix[lo] if hi > lo else 0
+
+    def average(self, start_key: str, end_key: str) -> float:
+        try:
+            days = (date.fromisoformat(end_key) - date.fromisoformat(start_key)).days + 1
+        except ValueError:
+            return 0.0
+        return self.range_total(start_key, end_key) / days if days > 0 else 0.0
+
+    def current_streak(self, today_key: str) -> int:
+        # Today still counts as in progress, so a streak that ended yesterday is still current.
+        i = self.index_of(today_key)
+        if i is None or i < 0:
+            return 0
+        if i < len(self.runs) and self.runs[i]:
+            return self.runs[i]
+        return self.runs[i - 1] if 0 < i <= len(self.runs) else 0
+
+
+class PlannerStorage:
+    # Persistence backend for tasks, per-day history and card state. The widget keeps the live task list;
+    # every mutation is reported through record() and history is read back through the day_* queries.
+
+    def open(self) -> None:
+        raise NotImplementedError
+
+    def load_tasks(self) -> TaskStore:
+        raise NotImplementedError
+
+    def record(self, event: dict[str, object]) -> bool:
+        # Returns True when the backend wants a checkpoint (full task snapshot) soon.
+        raise NotImplementedError
+
+    def checkpoint(self, tasks: list[dict[str, object]]) -> None:
+        raise NotImplementedError
+
+    def add_day_seconds(self, date_key: str, task_text: str, seconds: float) -> None:
+        raise NotImplementedError
+
+    def add_day_seconds_batch(self, rows: dict[tuple[str, str], float]) -> None:
+        # Bulk form of add_day_seconds; the caller checkpoints once afterwards.
+        for (date_key, task_text), seconds in rows.items():
+            self.add_day_seconds(date_key, task_text, seconds)
+
+    def day_total(self, date_key: str) -> float:
+        raise NotImplementedError
+
+    def day_record(self, date_key: str) -> dict[str, object]:
+        raise NotImplementedError
+
+    def day_totals(self, offset: int = 0, limit: int | None = None) -> list[tuple[str, float]]:
+        # Newest day first.
+        raise NotImplementedError
+
+    def iter_days(self) -> Iterator[tuple[str, dict[str, object]]]:
+        # Oldest day first.
+        raise NotImplementedError
+
+    def export_history(self) -> dict[str, dict[str, object]]:
+        return {date_key: day for date_key, day in self.iter_days()}
+
+    def task_names(self) -> list[str]:
+        raise NotImplementedError
+
+    def task_days(self, task_text: str) -> list[tuple[str, float]]:
+        # Every day the task has tracked time on, oldest first, read from the task -> days index.
+        raise NotImplementedError
+
+    def task_summary(self, task_text: str) -> dict[str, object]:
+        days = self.task_days(task_text)
+        return {
+            "total_seconds": sum(seconds for _date_key, seconds in days),
+            "days": len(days),
+            "first_day": days[0][0] if days else None,
+            "last_day": days[-1][0] if days else None,
+            "series": days,
+        }
+
+    def replace_tasks(self, tasks: list[dict[str, object]]) -> None:
+        raise NotImplementedError
+
+    def replace_history(self, history: dict[str, object]) -> None:
+        raise NotImplementedError
+
+    def has_note(self, task_id: str) -> bool:
+        raise NotImplementedError
+
+    def load_note(self, task_id: str) -> str:
+        raise NotImplementedError
+
+    def save_note(self, task_id: str, note: str) -> None:
+        # A blank memo removes the stored one.
+        raise NotImplementedError
+
+    def note_revisions(self, task_id: str) -> list[tuple[int, float]]:
+        # (revision, saved at), newest first.
+        raise NotImplementedError
+
+    def load_note_revision(self, task_id: str, rev: int) -> str:
+        raise NotImplementedError
+
+    def export_notes(self) -> dict[str, str]:
+        raise NotImplementedError
+
+    def replace_notes(self, notes: dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def load_card_state(self) -> object:
+        raise NotImplementedError
+
+    def save_card_state(self, state: dict[str, object]) -> None:
+        raise NotImplementedError
+
+    def close(self, tasks: list[dict[str, object]]) -> None:
+        raise NotImplementedError
+
+
+class JsonStorage(PlannerStorage):
+    def __init__(self) -> None:
+        self.history: dict[str, dict[str, object]] = {}
+        # History dates in ascending order, kept sorted as days are added so paging never re-sorts.
+        self.dates: list[str] = []
+        # Inverted index: task text -> ascending dates on which that task has time in the history.
+        self.task_index: dict[str, list[str]] = {}
+        self.journal = EventJournal(JOURNAL_FILE)
+        self.writer = PersistenceWriter()
+        # Ids of tasks with a memo file in NOTES_DIR; built from the directory listing without reading any memo.
+        self.note_index: set[str] = set()
+        # Sequence number of the last journaled event. Each snapshot file records the value it was taken at,
+        # so replay skips events a file already contains even if the journal outlived the snapshot.
+        self.journal_seq = 0
+        self.history_seq = 0
+        # Last revision number per memo log, read once per log so a save does not re-parse the whole history.
+        self.revision_heads: dict[str, int] = {}
+
+    def open(self) -> None:
+        raw = read_json_file(HISTORY_FILE)
+        self.set_history(raw if isinstance(raw, dict) else {})
+        days = raw.values() if isinstance(raw, dict) else []
+        self.history_seq = max(
+            (journal_watermark(day.get(JOURNAL_SEQ_KEY)) for day in days if isinstance(day, dict)), default=0
+        )
+        try:
+            self.note_index = {unquote(path.stem) for path in NOTES_DIR.glob("*.txt")}
+        except OSError:
+            self.note_index = set()
+
+    def load_tasks(self) -> TaskStore:
+        raw = read_json_file(DATA_FILE)
+        inline_notes: dict[str, str] = {}
+        tasks = TaskStore(clean_tasks(raw, inline_notes))
+        raw_ids = {item.get("id") for item in raw if isinstance(item, dict)} if isinstance(raw, list) else set()
+        raw_ids.discard(None)
+        needs_checkpoint = any(task.id not in raw_ids for task in tasks)
+        items = raw if isinstance(raw, list) else []
+        tasks_seq = max(
+            (journal_watermark(item.get(JOURNAL_SEQ_KEY)) for item in items if isinstance(item, dict)), default=0
+        )
+        self.journal_seq = max(tasks_seq, self.history_seq)
+        for task_id, note in inline_notes.items():
+            # Memo files win over inline copies: they can only have been written after a previous migration.
+            if task_id not in self.note_index:
+                self.save_note(task_id, note)
+            needs_checkpoint = True
+        for event in self.journal.read():
+            if event.get("event") == "note_saved":
+                needs_checkpoint = True
+            seq = event.get("seq")
+            if isinstance(seq, int) and not isinstance(seq, bool):
+                self.journal_seq = max(self.journal_seq, seq)
+                self.apply_event(tasks, event, seq > tasks_seq, seq > self.history_seq)
+            else:
+                # Written before events were numbered; nothing to compare against.
+                self.apply_event(tasks, event, True, True)
+        if needs_checkpoint:
+            # Minted ids and migrated memos must hit disk before the journal starts referring to them,
+            # and legacy note_saved events must not be replayed over memos edited later.
+            self.checkpoint([task.to_dict() for task in tasks])
+            self.writer.flush()
+        return tasks
+
+    def apply_event(self, tasks: TaskStore, event: dict[str, object], to_tasks: bool, to_history: bool) -> None:
+        # `to_tasks` / `to_history` say whether tasks.json / history.json are older than this event.
+        kind = event.get("event")
+        if kind == "note_saved":
+            # Written by older versions, which journaled memo text along with the task changes.
+            note = event.get("note", "")
+            self.save_note(str(event.get("id", "")), note if isinstance(note, str) else "")
+            return
+        if not to_tasks and not to_history:
+            return
+        task_id = str(event.get("id", ""))
+        task = tasks.get(task_id) if task_id and to_tasks else None
+
+        if kind == "task_added":
+            text = str(event.get("text", "")).strip()
+            if not to_tasks or task is not None or not task_id or not text:
+                return
+            tasks.append(Task(task_id, text))
+            return
+
+        if kind == "paused":
+            start_ts = event.get("start")
+            end_ts = event.get("end")
+            if isinstance(start_ts, (int, float)) and isinstance(end_ts, (int, float)):
+                # Even if the task is gone from the snapshot, its tracked time still belongs in history.
+                text = str(event.get("text") or "Untitled Task")
+                if to_history:
+                    for date_key, seconds in split_interval_by_day(float(start_ts), float(end_ts)):
+                        self.add_day_seconds(date_key, text, seconds)
+                if task is not None:
+                    task.elapsed_seconds += max(0.0, float(end_ts) - float(start_ts))
+
+        if task is None:
+            return
+
+        if kind == "started":
+            started_at = event.get("started_at")
+            if isinstance(started_at, (int, float)) and not task.done:
+                task.running = True
+                task.started_at = float(started_at)
+        elif kind == "paused":
+            task.running = False
+            task.started_at = None
+        elif kind == "done_toggled":
+            task.done = bool(event.get("done", False))
+            task.running = False
+            task.started_at = None
+        elif kind == "task_deleted":
+            tasks.remove(task_id)
+
+    def record(self, event: dict[str, object]) -> bool:
+        if event.get("event") == "task_deleted":
+            self.delete_note(str(event.get("id", "")))
+        self.journal_seq += 1
+        return self.journal.append({**event, "seq": self.journal_seq}) >= JOURNAL_COMPACT_BYTES
+
+    def tasks_file_payload(self, tasks: list[dict[str, object]]) -> list[dict[str, object]]:
+        payload = list(tasks)
+        if payload:
+            payload[-1] = {**payload[-1], JOURNAL_SEQ_KEY: self.journal_seq}
+        return payload
+
+    def history_file_payload(self) -> dict[str, dict[str, object]]:
+        payload = self.snapshot_history()
+        if self.dates:
+            payload[self.dates[-1]][JOURNAL_SEQ_KEY] = self.journal_seq
+        return payload
+
+    def snapshot_history(self) -> dict[str, dict[str, object]]:
+        snapshot: dict[str, dict[str, object]] = {}
+        for date_key, day in self.history.items():
+            if not isinstance(day, dict):
+                continue
+            copied = dict(day)
+            tasks = day.get("tasks")
+            if isinstance(tasks, dict):
+                copied["tasks"] = dict(tasks)
+            snapshot[date_key] = copied
+        return snapshot
+
+    def checkpoint(self, tasks: list[dict[str, object]]) -> None:
+        # Fold everything applied so far into the snapshot files. The sealed journal segment stays on disk
+        # until the writer has published both snapshots, so a crash in between loses nothing; the watermark in
+        # each file keeps a segment that outlives its snapshot from being applied twice.
+        sealed = self.journal.rotate()
+        files: dict[Path, object] = {
+            DATA_FILE: self.tasks_file_payload(tasks),
+            HISTORY_FILE: self.history_file_payload(),
+        }
+        if sealed is None:
+            self.writer.submit(files)
+        else:
+            self.writer.submit(files, on_written=lambda: self.journal.discard(sealed))
+
+    def set_history(self, history: dict[str, object]) -> None:
+        # The journal watermark only means something next to the file it was read from; keep it out of exports.
+        self.history = {
+            str(k): {field: value for field, value in v.items() if field != JOURNAL_SEQ_KEY}
+            for k, v in history.items()
+            if isinstance(v, dict)
+        }
+        self.dates = sorted(self.history.keys())
+        self.task_index = {}
+        for date_key in self.dates:
+            tasks = self.history[date_key].get("tasks")
+            if isinstance(tasks, dict):
+                for task_text in tasks:
+                    self.task_index.setdefault(str(task_text), []).append(date_key)
+
+    def add_day_seconds(self, date_key: str, task_text: str, seconds: float) -> None:
+        if date_key not in self.history:
+            bisect.insort(self.dates, date_key)
+        day = self.history.setdefault(date_key, {"total_seconds": 0.0, "tasks": {}})
+        day["total_seconds"] = float(day.get("total_seconds", 0.0)) + seconds
+        tasks = day.setdefault("tasks", {})
+        if task_text not in tasks:
+            bisect.insort(self.task_index.setdefault(task_text, []), date_key)
+        tasks[task_text] = float(tasks.get(task_text, 0.0)) + seconds
+
+    def day_total(self, date_key: str) -> float:
+        return float(self.history.get(date_key, {}).get("total_seconds", 0.0))
+
+    def day_record(self, date_key: str) -> dict[str, object]:
+        day = self.history.get(date_key, {})
+        tasks = day.get("tasks", {}) if isinstance(day, dict) else {}
+        return {
+            "total_seconds": float(day.get("total_seconds", 0.0)) if isinstance(day, dict) else 0.0,
+            "tasks": dict(tasks) if isinstance(tasks, dict) else {},
+        }
+
+    def day_totals(self, offset: int = 0, limit: int | None = None) -> list[tuple[str, float]]:
+        stop = len(self.dates) - offset
+        start = 0 if limit is None else max(0, stop - limit)
+        return [(date_key, self.day_total(date_key)) for date_key in reversed(self.dates[start : max(0, stop)])]
+
+    def iter_days(self) -> Iterator[tuple[str, dict[str, object]]]:
+        for date_key in list(self.dates):
+            yield date_key, self.day_record(date_key)
+
+    def export_history(self) -> dict[str, dict[str, object]]:
+        return self.snapshot_history()
+
+    def task_names(self) -> list[str]:
+        return sorted(self.task_index.keys())
+
+    def task_days(self, task_text: str) -> list[tuple[str, float]]:
+        days: list[tuple[str, float]] = []
+        for date_key in self.task_index.get(task_text, []):
+            seconds = self.history[date_key]["tasks"][task_text]
+            days.append((date_key, float(seconds) if isinstance(seconds, (int, float)) else 0.0))
+        return days
+
+    def replace_tasks(self, tasks: list[dict[str, object]]) -> None:
+        self.writer.submit({DATA_FILE: self.tasks_file_payload(tasks)})
+        self.writer.flush()
+        # The replaced snapshot already reflects every journaled change that still matters.
+        self.journal.clear()
+
+    def replace_history(self, history: dict[str, object]) -> None:
+        self.set_history(history)
+        self.writer.submit({HISTORY_FILE: self.history_file_payload()})
+        self.writer.flush()
+        self.journal.clear()
+
+    def note_path(self, task_id: str) -> Path:
+        return NOTES_DIR / f"{quote(task_id, safe='')}.txt"
+
+    def has_note(self, task_id: str) -> bool:
+        return task_id in self.note_index
+
+    def load_note(self, task_id: str) -> str:
+        if task_id not in self.note_index:
+            return ""
+        try:
+            return self.note_path(task_id).read_text(encoding="utf-8")
+        except OSError:
+            return ""
+
+    def revision_path(self, task_id: str) -> Path:
+        return NOTES_DIR / f"{quote(task_id, safe='')}.rev.jsonl"
+
+    def save_note(self, task_id: str, note: str) -> None:
+        if not task_id:
+            return
+        old = self.load_note(task_id)
+        if not note.strip():
+            note = ""
+        if note == old:
+            return
+        path = self.note_path(task_id)
+        try:
+            if note:
+                NOTES_DIR.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(path, note)
+                self.note_index.add(task_id)
+            else:
+                path.unlink(missing_ok=True)
+                self.note_index.discard(task_id)
+            self.append_revision(task_id, old, note)
+        except OSError:
+            pass
+
+    def delete_note(self, task_id: str) -> None:
+        self.note_index.discard(task_id)
+        self.revision_heads.pop(task_id, None)
+        for path in (self.note_path(task_id), self.revision_path(task_id)):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def read_revisions(self, task_id: str) -> tuple[list[dict[str, object]], bool]:
+        # Returns the readable revisions and whether the log ends with a complete line.
+        try:
+            raw = self.revision_path(task_id).read_text(encoding="utf-8")
+        except OSError:
+            return [], True
+        revisions: list[dict[str, object]] = []
+        for raw_line in raw.splitlines():
+            try:
+                entry = json.loads(raw_line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get("rev"), int):
+                revisions.append(entry)
+        return revisions, raw.endswith("\n") or not raw
+
+    def append_revision(self, task_id: str, old: str, new: str) -> None:
+        complete = True
+        if task_id not in self.revision_heads:
+            revisions, complete = self.read_revisions(task_id)
+            self.revision_heads[task_id] = int(revisions[-1]["rev"]) if revisions else -1
+        rev = self.revision_heads[task_id] + 1
+        keyframe, delta = note_revision_body(rev, old, new)
+        entry: dict[str, object] = {"rev": rev, "ts": time.time()}
+        if keyframe is not None:
+            entry["text"] = keyframe
+        else:
+            entry["delta"] = delta
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self.revision_path(task_id).open("a", encoding="utf-8") as fh:
+                # Start on a fresh line if a crash left a partial one behind.
+                fh.write(line if complete else "\n" + line)
+        except OSError:
+            # The log may now end mid-line; re-read it on the next save.
+            self.revision_heads.pop(task_id, None)
+            raise
+        self.revision_heads[task_id] = rev
+
+    def note_revisions(self, task_id: str) -> list[tuple[int, float]]:
+        revisions, _complete = self.read_revisions(task_id)
+        return [(int(entry["rev"]), float(entry.get("ts") or 0.0)) for entry in reversed(revisions)]
+
+    def load_note_revision(self, task_id: str, rev: int) -> str:
+        revisions, _complete = self.read_revisions(task_id)
+        upto = [entry for entry in revisions if int(entry["rev"]) <= rev]
+        start = 0
+        for pos in range(len(upto) - 1, -1, -1):
+            if isinstance(upto[pos].get("text"), str):
+                start = pos
+                break
+        return replay_note_revisions((entry.get("text"), entry.get("delta")) for entry in upto[start:])
+
+    def export_notes(self) -> dict[str, str]:
+        return {task_id: self.load_note(task_id) for task_id in sorted(self.note_index)}
+
+    def replace_notes(self, notes: dict[str, str]) -> None:
+        try:
+            logged = {unquote(path.name[: -len(".rev.jsonl")]) for path in NOTES_DIR.glob("*.rev.jsonl")}
+        except OSError:
+            logged = set()
+        for task_id in (self.note_index | logged) - set(notes):
+            self.delete_note(task_id)
+        for task_id, note in notes.items():
+            self.save_note(task_id, note)
+
+    def load_card_state(self) -> object:
+        return read_json_file(CARDS_STATE_FILE)
+
+    def save_card_state(self, state: dict[str, object]) -> None:
+        self.writer.submit({CARDS_STATE_FILE: state})
+
+    def close(self, tasks: list[dict[str, object]]) -> None:
+        self.checkpoint(tasks)
+        self.writer.close()
+
+
+class SqliteStorage(PlannerStorage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            elapsed_seconds REAL NOT NULL DEFAULT 0,
+            started_at REAL,
+            running INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_position ON tasks(position);
+        CREATE TABLE IF NOT EXISTS notes (task_id TEXT PRIMARY KEY, note TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS note_revisions (
+            task_id TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            saved_at REAL NOT NULL,
+            keyframe TEXT,
+            delta TEXT,
+            PRIMARY KEY (task_id, rev)
+        );
+        CREATE TABLE IF NOT EXISTS daily_totals (date TEXT PRIMARY KEY, total_seconds REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS day_task_seconds (
+            date TEXT NOT NULL,
+            task TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            PRIMARY KEY (date, task)
+        );
+        CREATE INDEX IF NOT EXISTS idx_day_task_seconds_task ON day_task_seconds(task, date);
+        CREATE TABLE IF NOT EXISTS card_awards (date TEXT PRIMARY KEY, card TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS cards_unlocked (card TEXT PRIMARY KEY);
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.conn: sqlite3.Connection | None = None
+        self.day_total_cache: dict[str, float] = {}
+        self.note_index: set[str] = set()
+
+    def open(self) -> None:
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        migrated = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if migrated is None:
+            self.migrate_from_json()
+        self.note_index = {row[0] for row in self.db.execute("SELECT task_id FROM notes WHERE trim(note) != ''")}
+
+    def migrate_from_json(self) -> None:
+        legacy = JsonStorage()
+        legacy.open()
+        tasks = legacy.load_tasks()
+        card_state = legacy.load_card_state()
+        # Leave the JSON files fully compacted as a readable backup of what was imported.
+        snapshot = [task.to_dict() for task in tasks]
+        legacy.close(snapshot)
+
+        self.write_tasks(snapshot)
+        self.write_notes(legacy.export_notes())
+        self.write_history(legacy.history)
+        if isinstance(card_state, dict):
+            self.save_card_state(card_state)
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+            (datetime.now().isoformat(timespec="seconds"),),
+        )
+        self.db.commit()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self.conn is None:
+            raise RuntimeError("SQLite storage is not open.")
+        return self.conn
+
+    def load_tasks(self) -> TaskStore:
+        rows = self.db.execute(
+            "SELECT id, text, done, elapsed_seconds, started_at, running FROM tasks ORDER BY position"
+        ).fetchall()
+        return TaskStore(
+            clean_tasks(
+                [
+                    {
+                        "id": task_id,
+                        "text": text,
+                        "done": bool(done),
+                        "elapsed_seconds": elapsed,
+                        "started_at": started_at,
+                        "running": bool(running),
+                    }
+                    for task_id, text, done, elapsed, started_at, running in rows
+                ]
+            )
+        )
+
+    def write_tasks(self, tasks: list[dict[str, object]]) -> None:
+        self.db.execute("DELETE FROM tasks")
+        self.db.executemany(
+            "INSERT INTO tasks (id, position, text, done, elapsed_seconds, started_at, running) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    task["id"],
+                    pos,
+                    task["text"],
+                    int(bool(task["done"])),
+                    task["elapsed_seconds"],
+                    task["started_at"],
+                    int(bool(task["running"])),
+                )
+                for pos, task in enumerate(tasks)
+            ],
+        )
+
+    def write_notes(self, notes: dict[str, str]) -> None:
+        stale = [
+            (task_id,)
+            for (task_id,) in self.db.execute("SELECT task_id FROM notes UNION SELECT task_id FROM note_revisions")
+            if task_id not in notes
+        ]
+        self.db.executemany("DELETE FROM notes WHERE task_id = ?", stale)
+        self.db.executemany("DELETE FROM note_revisions WHERE task_id = ?", stale)
+        self.note_index.difference_update(task_id for (task_id,) in stale)
+        for task_id, note in notes.items():
+            self.write_note(task_id, note)
+
+    def write_history(self, history: dict[str, object]) -> None:
+        self.db.execute("DELETE FROM daily_totals")
+        self.db.execute("DELETE FROM day_task_seconds")
+        self.day_total_cache = {}
+        totals: list[tuple[str, float]] = []
+        per_task: list[tuple[str, str, float]] = []
+        for date_key, day in history.items():
+            if not isinstance(day, dict):
+                continue
+            total = day.get("total_seconds", 0.0)
+            totals.append((str(date_key), float(total) if isinstance(total, (int, float)) else 0.0))
+            tasks = day.get("tasks", {})
+            if isinstance(tasks, dict):
+                for task_text, seconds in tasks.items():
+                    if isinstance(seconds, (int, float)):
+                        per_task.append((str(date_key), str(task_text), float(seconds)))
+        self.db.executemany("INSERT INTO daily_totals (date, total_seconds) VALUES (?, ?)", totals)
+        self.db.executemany("INSERT INTO day_task_seconds (date, task, seconds) VALUES (?, ?, ?)", per_task)
+
+    def record(self, event: dict[str, object]) -> bool:
+        kind = event.get("event")
+        task_id = str(event.get("id", ""))
+        if kind == "task_added":
+            self.db.execute(
+                "INSERT OR IGNORE INTO tasks (id, position, text) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM tasks), ?)",
+                (task_id, str(event.get("text", ""))),
+            )
+        elif kind == "started":
+            self.db.execute(
+                "UPDATE tasks SET running = 1, started_at = ? WHERE id = ?",
+                (event.get("started_at"), task_id),
+            )
+        elif kind == "paused":
+            start_ts = event.get("start")
+            end_ts = event.get("end")
+            added = 0.0
+            if isinstance(start_ts, (int, float)) and isinstance(end_ts, (int, float)):
+                added = max(0.0, float(end_ts) - float(start_ts))
+            self.db.execute(
+                "UPDATE tasks SET elapsed_seconds = elapsed_seconds + ?, running = 0, started_at = NULL WHERE id = ?",
+                (added, task_id),
+            )
+        elif kind == "done_toggled":
+            self.db.execute(
+                "UPDATE tasks SET done = ?, running = 0, started_at = NULL WHERE id = ?",
+                (int(bool(event.get("done", False))), task_id),
+            )
+        elif kind == "task_deleted":
+            self.db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self.db.execute("DELETE FROM notes WHERE task_id = ?", (task_id,))
+            self.db.execute("DELETE FROM note_revisions WHERE task_id = ?", (task_id,))
+            self.note_index.discard(task_id)
+        # History rows added for this event (add_day_seconds) are committed in the same transaction.
+        self.db.commit()
+        return False
+
+    def checkpoint(self, tasks: list[dict[str, object]]) -> None:
+        self.write_tasks(tasks)
+        self.db.commit()
+
+    def add_day_seconds(self, date_key: str, task_text: str, seconds: float) -> None:
+        self.db.execute(
+            "INSERT INTO daily_totals (date, total_seconds) VALUES (?, ?) "
+            "ON CONFLICT(date) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds",
+            (date_key, seconds),
+        )
+        self.db.execute(
+            "INSERT INTO day_task_seconds (date, task, seconds) VALUES (?, ?, ?) "
+            "ON CONFLICT(date, task) DO UPDATE SET seconds = seconds + excluded.seconds",
+            (date_key, task_text, seconds),
+        )
+        self.day_total_cache.pop(date_key, None)
+
+    def add_day_seconds_batch(self, rows: dict[tuple[str, str], float]) -> None:
+        day_sums: dict[str, float] = {}
+        for (date_key, _task_text), seconds in rows.items():
+            day_sums[date_key] = day_sums.get(date_key, 0.0) + seconds
+        self.db.executemany(
+            "INSERT INTO daily_totals (date, total_seconds) VALUES (?, ?) "
+            "ON CONFLICT(date) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds",
+            list(day_sums.items()),
+        )
+        self.db.executemany(
+            "INSERT INTO day_task_seconds (date, task, seconds) VALUES (?, ?, ?) "
+            "ON CONFLICT(date, task) DO UPDATE SET seconds = seconds + excluded.seconds",
+            [(date_key, task_text, seconds) for (date_key, task_text), seconds in rows.items()],
+        )
+        self.day_total_cache.clear()
+
+    def day_total(self, date_key: str) -> float:
+        cached = self.day_total_cache.get(date_key)
+        if cached is not None:
+            return cached
+        row = self.db.execute("SELECT total_seconds FROM daily_totals WHERE date = ?", (date_key,)).fetchone()
+        total = float(row[0]) if row is not None else 0.0
+        self.day_total_cache[date_key] = total
+        return total
+
+    def day_record(self, date_key: str) -> dict[str, object]:
+        rows = self.db.execute("SELECT task, seconds FROM day_task_seconds WHERE date = ?", (date_key,)).fetchall()
+        return {"total_seconds": self.day_total(date_key), "tasks": {task: seconds for task, seconds in rows}}
+
+    def day_totals(self, offset: int = 0, limit: int | None = None) -> list[tuple[str, float]]:
+        rows = self.db.execute(
+            "SELECT date, total_seconds FROM daily_totals ORDER BY date DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        ).fetchall()
+        return [(date_key, float(total)) for date_key, total in rows]
+
+    def iter_days(self) -> Iterator[tuple[str, dict[str, object]]]:
+        totals = self.db.execute("SELECT date, total_seconds FROM daily_totals ORDER BY date").fetchall()
+        breakdown = self.db.execute("SELECT date, task, seconds FROM day_task_seconds ORDER BY date").fetchall()
+        pos = 0
+        for date_key, total in totals:
+            tasks: dict[str, float] = {}
+            while pos < len(breakdown) and breakdown[pos][0] < date_key:
+                pos += 1
+            while pos < len(breakdown) and breakdown[pos][0] == date_key:
+                tasks[breakdown[pos][1]] = float(breakdown[pos][2])
+                pos += 1
+            yield date_key, {"total_seconds": float(total), "tasks": tasks}
+
+    def task_names(self) -> list[str]:
+        return [row[0] for row in self.db.execute("SELECT DISTINCT task FROM day_task_seconds ORDER BY task")]
+
+    def task_days(self, task_text: str) -> list[tuple[str, float]]:
+        rows = self.db.execute(
+            "SELECT date, seconds FROM day_task_seconds WHERE task = ? ORDER BY date", (task_text,)
+        ).fetchall()
+        return [(date_key, float(seconds)) for date_key, seconds in rows]
+
+    def replace_tasks(self, tasks: list[dict[str, object]]) -> None:
+        self.write_tasks(tasks)
+        self.db.commit()
+
+    def replace_history(self, history: dict[str, object]) -> None:
+        self.write_history(history)
+        self.db.commit()
+
+    def has_note(self, task_id: str) -> bool:
+        return task_id in self.note_index
+
+    def load_note(self, task_id: str) -> str:
+        if task_id not in self.note_index:
+            return ""
+        row = self.db.execute("SELECT note FROM notes WHERE task_id = ?", (task_id,)).fetchone()
+        return str(row[0]) if row is not None else ""
+
+    def save_note(self, task_id: str, note: str) -> None:
+        self.write_note(task_id, note)
+        self.db.commit()
+
+    def write_note(self, task_id: str, note: str) -> None:
+        old = self.load_note(task_id)
+        if not note.strip():
+            note = ""
+        if note == old:
+            return
+        if note:
+            self.db.execute(
+                "INSERT INTO notes (task_id, note) VALUES (?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET note = excluded.note",
+                (task_id, note),
+            )
+            self.note_index.add(task_id)
+        else:
+            self.db.execute("DELETE FROM notes WHERE task_id = ?", (task_id,))
+            self.note_index.discard(task_id)
+        row = self.db.execute("SELECT MAX(rev) FROM note_revisions WHERE task_id = ?", (task_id,)).fetchone()
+        rev = int(row[0]) + 1 if row is not None and row[0] is not None else 0
+        keyframe, delta = note_revision_body(rev, old, note)
+        self.db.execute(
+            "INSERT INTO note_revisions (task_id, rev, saved_at, keyframe, delta) VALUES (?, ?, ?, ?, ?)",
+            (
+                task_id,
+                rev,
+                time.time(),
+                keyframe,
+                None if delta is None else json.dumps(delta, ensure_ascii=False, separators=(",", ":")),
+            ),
+        )
+
+    def note_revisions(self, task_id: str) -> list[tuple[int, float]]:
+        return [
+            (int(rev), float(saved_at))
+            for rev, saved_at in self.db.execute(
+                "SELECT rev, saved_at FROM note_revisions WHERE task_id = ? ORDER BY rev DESC", (task_id,)
+            )
+        ]
+
+    def load_note_revision(self, task_id: str, rev: int) -> str:
+        row = self.db.execute(
+            "SELECT MAX(rev) FROM note_revisions WHERE task_id = ? AND rev <= ? AND keyframe IS NOT NULL",
+            (task_id, rev),
+        ).fetchone()
+        start = int(row[0]) if row is not None and row[0] is not None else 0
+        rows = self.db.execute(
+            "SELECT keyframe, delta FROM note_revisions WHERE task_id = ? AND rev BETWEEN ? AND ? ORDER BY rev",
+            (task_id, start, rev),
+        ).fetchall()
+        bodies: list[tuple[str | None, object]] = []
+        for keyframe, delta in rows:
+            try:
+                bodies.append((keyframe, json.loads(delta) if keyframe is None and delta else None))
+            except json.JSONDecodeError:
+                bodies.append((keyframe, None))
+        return replay_note_revisions(bodies)
+
+    def export_notes(self) -> dict[str, str]:
+        return {task_id: note for task_id, note in self.db.execute("SELECT task_id, note FROM notes") if note.strip()}
+
+    def replace_notes(self, notes: dict[str, str]) -> None:
+        self.write_notes(notes)
+        self.db.commit()
+
+    def load_card_state(self) -> object:
+        unlocked = [row[0] for row in self.db.execute("SELECT card FROM cards_unlocked ORDER BY card")]
+        awarded = {date_key: card for date_key, card in self.db.execute("SELECT date, card FROM card_awards")}
+        return {"unlocked": unlocked, "awarded_dates": awarded}
+
+    def save_card_state(self, state: dict[str, object]) -> None:
+        unlocked = state.get("unlocked", [])
+        awarded = state.get("awarded_dates", {})
+        self.db.execute("DELETE FROM cards_unlocked")
+        self.db.execute("DELETE FROM card_awards")
+        if isinstance(unlocked, list):
+            self.db.executemany("INSERT OR IGNORE INTO cards_unlocked (card) VALUES (?)", [(str(x),) for x in unlocked])
+        if isinstance(awarded, dict):
+            self.db.executemany(
+                "INSERT INTO card_awards (date, card) VALUES (?, ?)",
+                [(str(k), str(v)) for k, v in awarded.items()],
+            )
+        self.db.commit()
+
+    def close(self, tasks: list[dict[str, object]]) -> None:
+        if self.conn is None:
+            return
+        self.checkpoint(tasks)
+        self.conn.close()
+        self.conn = None
+
+
+def open_storage() -> PlannerStorage:
+    storage: PlannerStorage
+    if STORAGE_BACKEND == "sqlite":
+        storage = SqliteStorage(DB_FILE)
+    else:
+        storage = JsonStorage()
+    storage.open()
+    return storage
+
+
+class ThumbnailCache:
+    # Pre-scaled card thumbnails stored as small PNGs, so reopening the Library decodes a few KB per card
+    # instead of the full-resolution image. Entries are keyed by source path, mtime, size and target box,
+    # so an edited or replaced card simply misses; prune() drops entries whose source changed or vanished.
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.index_path = directory / "index.json"
+        raw = read_json_file(self.index_path)
+        self.entries: dict[str, dict[str, object]] = {}
+        if isinstance(raw, dict):
+            for key, entry in raw.items():
+                if not isinstance(entry, dict):
+                    continue
+                if isinstance(entry.get("file"), str) and isinstance(entry.get("source"), str):
+                    self.entries[str(key)] = entry
+        self.dirty = False
+        # Library decoder threads store and look up entries too.
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def key_for(source: Path, max_w: int, max_h: int) -> str | None:
+        try:
+            st = source.stat()
+        except OSError:
+            return None
+        raw = f"{source.resolve()}|{st.st_mtime_ns}|{st.st_size}|{max_w}x{max_h}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def lookup(self, key: str) -> Path | None:
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+        path = self.directory / str(entry["file"])
+        try:
+            valid = path.stat().st_size > 0
+        except OSError:
+            valid = False
+        if not valid:
+            self.discard(key)
+            return None
+        return path
+
+    def thumb_size(self, key: str) -> tuple[int, int] | None:
+        with self.lock:
+            entry = self.entries.get(key)
+        size = entry.get("size") if entry is not None else None
+        if isinstance(size, list) and len(size) == 2 and all(isinstance(x, int) and x > 0 for x in size):
+            return size[0], size[1]
+        return None
+
+    def discard(self, key: str) -> None:
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            self.dirty = True
+        try:
+            (self.directory / str(entry["file"])).unlink()
+        except OSError:
+            pass
+
+    def store(
+        self,
+        key: str,
+        source: Path,
+        max_w: int,
+        max_h: int,
+        size: tuple[int, int],
+        write: Callable[[str], None],
+    ) -> Path | None:
+        # `write` saves the thumbnail as PNG to the path it is given (PIL's save or PhotoImage.write).
+        name = f"{key}.png"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=str(self.directory))
+            os.close(fd)
+        except OSError:
+            return None
+        try:
+            write(tmp_name)
+            os.replace(tmp_name, self.directory / name)
+        except Exception:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            return None
+        with self.lock:
+            self.entries[key] = {"file": name, "source": str(source), "box": [max_w, max_h], "size": list(size)}
+            self.dirty = True
+        return self.directory / name
+
+    def prune(self) -> None:
+        with self.lock:
+            entries = list(self.entries.items())
+        for key, entry in entries:
+            box = entry.get("box")
+            if not (isinstance(box, list) and len(box) == 2):
+                self.discard(key)
+                continue
+            if self.key_for(Path(str(entry["source"])), int(box[0]), int(box[1])) != key:
+                self.discard(key)
+        # Thumbnails left behind by a crash before the index was saved.
+        with self.lock:
+            live = {str(entry["file"]) for entry in self.entries.values()}
+        try:
+            orphans = [p for p in self.directory.iterdir() if p.name != self.index_path.name and p.name not in live]
+        except OSError:
+            orphans = []
+        for path in orphans:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self.save()
+
+    def save(self) -> None:
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(self.index_path, json.dumps(self.entries, indent=2, ensure_ascii=False))
+            except OSError:
+                return
+            self.dirty = False
+
+
+def fit_thumbnail_size(width: int, height: int, max_w: int, max_h: int) -> tuple[int, int]:
+    # Same box fit as PIL's Image.thumbnail: keep the aspect ratio, never upscale.
+    if width <= max_w and height <= max_h:
+        return max(1, width), max(1, height)
+    scale = min(max_w / width, max_h / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def read_image_size(path: Path) -> tuple[int, int] | None:
+    # PIL only parses the header here; pixel data is not decoded.
+    try:
+        from PIL import Image  # type: ignore
+
+        with Image.open(path) as pil_img:
+            return pil_img.size
+    except Exception:
+        return None
+
+
+def decode_card_thumbnail(cache: ThumbnailCache, source: Path, max_w: int, max_h: int) -> tuple[str, object]:
+    # Safe to run off the Tk thread. Returns ("file", png path) for a disk cache hit, ("pil", image) for a
+    # fresh Pillow decode, or ("tk", None) when only Tk can read the image and it must be decoded on the UI thread.
+    key = cache.key_for(source, max_w, max_h)
+    cached_path = cache.lookup(key) if key is not None else None
+    if cached_path is not None:
+        return "file", cached_path
+    try:
+        from PIL import Image  # type: ignore
+
+        with Image.open(source) as pil_img:
+            # Resizing the opened image (not a copy) lets JPEG decode at a reduced scale.
+            pil_img.thumbnail((max_w, max_h))
+            thumb = pil_img.copy()
+        if thumb.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            thumb = thumb.convert("RGBA")
+    except Exception:
+        return "tk", None
+    if key is not None:
+        cache.store(key, source, max_w, max_h, thumb.size, lambda out: thumb.save(out, format="PNG"))
+    return "pil", thumb
+
+
+class ThumbnailLoader:
+    # Pool of daemon threads decoding Library thumbnails in priority order (lower first). Results go to
+    # `results` as (cache key, source, box, decode_card_thumbnail result) for the UI thread to poll; Tk images
+    # are only ever created there. cancel() drops everything still queued, e.g. when the Library window closes.
+
+    def __init__(self, cache: ThumbnailCache, workers: int) -> None:
+        self.cache = cache
+        self.workers = workers
+        self.requests: "queue.PriorityQueue[tuple[float, int, int, str, Path, int, int]]" = queue.PriorityQueue()
+        self.results: "queue.Queue[tuple[str, Path, int, int, tuple[str, object]]]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.seq = 0
+        # Sequence number of each key's latest queued request: re-submitting a key (to raise its priority) leaves
+        # the older entries in the queue, and workers skip them. A key leaves this map once a worker takes it, so
+        # it can be submitted again after delivery (e.g. once its image was evicted from the LRU).
+        self.pending: dict[str, int] = {}
+        self.in_flight: set[str] = set()
+        self.threads: list[threading.Thread] = []
+
+    def submit(self, priority: float, key: str, source: Path, max_w: int, max_h: int) -> None:
+        with self.lock:
+            if key in self.in_flight:
+                return
+            self.seq += 1
+            self.pending[key] = self.seq
+            self.requests.put((priority, self.seq, self.generation, key, source, max_w, max_h))
+            if not self.threads:
+                for i in range(self.workers):
+                    worker = threading.Thread(target=self.run, name=f"planner-thumbnails-{i}", daemon=True)
+                    worker.start()
+                    self.threads.append(worker)
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.generation += 1
+            # Decodes already running still finish and report; only queued requests are dropped.
+            self.pending.clear()
+            try:
+                while True:
+                    self.requests.get_nowait()
+            except queue.Empty:
+                pass
+
+    def run(self) -> None:
+        while True:
+            _priority, seq, generation, key, source, max_w, max_h = self.requests.get()
+            with self.lock:
+                if generation != self.generation or self.pending.get(key) != seq:
+                    continue
+                del self.pending[key]
+                self.in_flight.add(key)
+            try:
+                result = decode_card_thumbnail(self.cache, source, max_w, max_h)
+            except Exception:
+                result = ("tk", None)
+            with self.lock:
+                self.in_flight.discard(key)
+            self.results.put((key, source, max_w, max_h, result))
+
+
+class ImageLRU:
+    # Least-recently-used cache of decoded images bounded by an estimated byte size (width x height x 4).
+    # A key pinned by a live widget is never evicted. Each widget pins at most one key: pinning another key
+    # (a recycled widget) or release() unpins it, and the cache trims back to budget on the next put. Callers
+    # bind the widget's <Destroy> to release() once, when they create it.
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self.images: "OrderedDict[str, tk.PhotoImage]" = OrderedDict()
+        self.sizes: dict[str, int] = {}
+        self.pins: dict[str, int] = {}
+        self.pin_owners: dict[str, str] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.images
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def get(self, key: str) -> tk.PhotoImage | None:
+        img = self.images.get(key)
+        if img is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.images.move_to_end(key)
+        return img
+
+    def put(self, key: str, img: tk.PhotoImage) -> None:
+        if key in self.images:
+            self.total_bytes -= self.sizes[key]
+        self.images[key] = img
+        self.images.move_to_end(key)
+        self.sizes[key] = max(1, img.width()) * max(1, img.height()) * 4
+        self.total_bytes += self.sizes[key]
+        self.trim()
+
+    def pin(self, key: str, widget: tk.Widget) -> None:
+        name = str(widget)
+        previous = self.pin_owners.get(name)
+        if previous == key:
+            return
+        if previous is not None:
+            self.unpin(previous)
+        self.pin_owners[name] = key
+        self.pins[key] = self.pins.get(key, 0) + 1
+
+    def release(self, widget: tk.Widget | str) -> None:
+        key = self.pin_owners.pop(str(widget), None)
+        if key is not None:
+            self.unpin(key)
+
+    def unpin(self, key: str) -> None:
+        count = self.pins.get(key, 0) - 1
+        if count > 0:
+            self.pins[key] = count
+        else:
+            self.pins.pop(key, None)
+
+    def trim(self) -> None:
+        if self.total_bytes <= self.budget_bytes:
+            return
+        for key in list(self.images):
+            if self.total_bytes <= self.budget_bytes:
+                break
+            if key in self.pins:
+                continue
+            del self.images[key]
+            self.total_bytes -= self.sizes.pop(key)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "images": len(self.images),
+            "bytes": self.total_bytes,
+            "pinned": len(self.pins),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def library_column_count(viewport_w: int) -> int:
+    if viewport_w >= 1180:
+        return 4
+    if viewport_w >= 820:
+        return 3
+    return 2
+
+
+def masonry_layout(heights: list[int], columns: int, gap: int) -> tuple[list[tuple[int, int]], list[int]]:
+    # Pinterest-style placement: each item goes to the currently shortest column. Returns (column, y) per item
+    # and the final height of every column.
+    column_heights = [0] * columns
+    positions: list[tuple[int, int]] = []
+    for height in heights:
+        column = min(range(columns), key=column_heights.__getitem__)
+        positions.append((column, column_heights[column]))
+        column_heights[column] += height + gap
+    return positions, column_heights
+
+
+class TaskRow:
+    # Widgets for one task line. Callbacks look the task up by id at click time, so a row stays valid
+    # while other rows are added, removed or moved around it.
+
+    def __init__(self, owner: "FloatingTaskWidget", parent: tk.Widget) -> None:
+        self.owner = owner
+        self.task_id = ""
+        self.state: tuple[str, bool, bool] | None = None
+        self.time_text = ""
+        self.separator_visible = False
+
+        self.frame = tk.Frame(parent, bg=owner.panel, padx=8, pady=6)
+        self.frame.grid_columnconfigure(1, weight=1)
+
+        self.toggle_btn = tk.Button(
+            self.frame,
+            text="[ ]",
+            width=3,
+            command=lambda: owner.toggle_task(self.task_id),
+            relief="flat",
+            bd=0,
+            bg=owner.soft_blue,
+            fg=owner.text,
+            activebackground="#cfdeea",
+        )
+        self.toggle_btn.grid(row=0, column=0, sticky="nw", rowspan=2)
+
+        self.title_label = tk.Label(
+            self.frame,
+            text="",
+            bg=owner.panel,
+            fg=owner.text,
+            font=owner.default_font,
+            anchor="w",
+            cursor="hand2",
+        )
+        self.title_label.grid(row=0, column=1, sticky="ew", padx=(8, 8))
+        self.title_label.bind("<Button-1>", lambda _event: owner.open_task_note_window(self.task_id))
+
+        self.timer_label = tk.Label(
+            self.frame, text="", bg=owner.panel, fg=owner.muted, anchor="w", font=("TkDefaultFont", 10)
+        )
+        self.timer_label.grid(row=1, column=1, sticky="w", padx=(8, 8))
+
+        self.run_btn = tk.Button(
+            self.frame,
+            text="Start",
+            command=lambda: owner.toggle_run_task(self.task_id),
+            width=6,
+            relief="flat",
+            bd=0,
+            bg=owner.soft_green,
+            fg=owner.text,
+        )
+        self.run_btn.grid(row=0, column=2, padx=(4, 4), sticky="ne", rowspan=2)
+
+        self.del_btn = tk.Button(
+            self.frame,
+            text="Del",
+            command=lambda: owner.delete_task(self.task_id),
+            relief="flat",
+            bd=0,
+            bg=owner.soft_rose,
+            fg=owner.text,
+            activebackground="#e8d5d8",
+        )
+        self.del_btn.grid(row=0, column=3, sticky="ne", rowspan=2)
+
+        self.separator = tk.Frame(parent, bg=owner.line, height=1)
+
+    def bind(self, task: Task) -> None:
+        self.task_id = task.id
+        state = (task.text, task.done, task.running)
+        if state == self.state:
+            return
+        txt, done, running = state
+        owner = self.owner
+        self.toggle_btn.config(text=("[x]" if done else "[ ]"))
+        self.title_label.config(
+            text=txt,
+            fg=(owner.muted if done else owner.text),
+            font=(owner.done_font if done else owner.default_font),
+        )
+        self.run_btn.config(
+            text=("Pause" if running else "Start"),
+            bg=(owner.soft_rose if done else owner.soft_green),
+            state=("disabled" if done else "normal"),
+        )
+        self.state = state
+
+    def set_time_text(self, text: str) -> None:
+        if text != self.time_text:
+            self.timer_label.config(text=text)
+            self.time_text = text
+
+    def pack_at_end(self) -> None:
+        self.separator.pack_forget()
+        self.separator_visible = False
+        self.frame.pack_forget()
+        self.frame.pack(fill="x")
+
+    def show_separator(self, visible: bool) -> None:
+        if visible == self.separator_visible:
+            return
+        if visible:
+            self.separator.pack(fill="x", padx=8, after=self.frame)
+        else:
+            self.separator.pack_forget()
+        self.separator_visible = visible
+
+    def destroy(self) -> None:
+        self.separator.destroy()
+        self.frame.destroy()
+
+
+class LibraryCardSlot:
+    # Widgets for one on-screen Library card, placed on the Library canvas as a window item. Slots are pooled
+    # and rebound to whichever cards intersect the viewport; callbacks read the bound card at event time.
+
+    def __init__(self, owner: "FloatingTaskWidget", canvas: tk.Canvas) -> None:
+        self.owner = owner
+        self.canvas = canvas
+        self.card_name = ""
+        self.owned = False
+        self.cache_key = ""
+
+        self.frame = tk.Frame(canvas, highlightthickness=1, bd=0, padx=8, pady=8)
+        self.holder = tk.Canvas(self.frame, highlightthickness=0, bd=0)
+        self.holder.pack(anchor="center")
+        self.holder.bind("<Destroy>", lambda _event: owner.card_images_cache.release(self.holder), add="+")
+        self.name_label = tk.Label(self.frame, anchor="w", justify="left", font=LIBRARY_NAME_FONT)
+        self.name_label.pack(fill="x", pady=(8, 2))
+        self.state_label = tk.Label(self.frame, padx=6, pady=2, font=("TkDefaultFont", 9))
+        self.state_label.pack(anchor="w")
+        self.item = canvas.create_window((0, 0), window=self.frame, anchor="nw", state="hidden")
+
+        for widget in (self.frame, self.holder, self.name_label, self.state_label):
+            widget.bind("<Enter>", self.on_enter)
+            widget.bind("<Leave>", self.on_leave)
+            widget.bind("<Button-1>", self.on_click)
+
+    def bind(self, card_name: str, owned: bool, size: tuple[int, int], img: tk.PhotoImage | None) -> None:
+        self.card_name = card_name
+        self.owned = owned
+        self.cache_key = f"{CARDS_DIR / card_name}:{LIBRARY_THUMB_WIDTH}x{LIBRARY_THUMB_HEIGHT}"
+        self.frame.config(
+            bg=("#fffdf4" if owned else "#ececec"),
+            highlightbackground=("#e7d78f" if owned else "#d4d4d4"),
+            cursor=("hand2" if owned else "arrow"),
+        )
+        self.name_label.config(
+            text=card_name,
+            bg=("#fffdf4" if owned else "#ececec"),
+            fg=("#3f4f63" if owned else "#777777"),
+            wraplength=LIBRARY_NAME_WRAP,
+        )
+        self.state_label.config(
+            text=("Collected" if owned else "Not collected"),
+            bg=("#f8edbd" if owned else "#dedede"),
+            fg=("#5a4f1c" if owned else "#666666"),
+        )
+        if img is not None:
+            self.owner.show_card_thumbnail(self.holder, self.cache_key, img)
+        elif owned:
+            self.show_placeholder(size, "#f8f1ce", "Loading…", "#6a613f")
+        else:
+            self.show_placeholder((LIBRARY_THUMB_WIDTH, 140), "#d7d7d7", "Locked", "#777777")
+
+    def show_placeholder(self, size: tuple[int, int], bg: str, text: str, fg: str) -> None:
+        self.owner.card_images_cache.release(self.holder)
+        self.holder.image = None
+        self.holder.delete("all")
+        self.holder.config(width=size[0], height=size[1], bg=bg)
+        self.holder.create_text(size[0] // 2, size[1] // 2, text=text, fill=fg, font=("TkDefaultFont", 11, "bold"))
+
+    def place(self, x: float, y: float, width: float, height: float) -> None:
+        self.canvas.coords(self.item, x, y)
+        self.canvas.itemconfigure(self.item, width=width, height=height, state="normal")
+
+    def hide(self) -> None:
+        self.canvas.itemconfigure(self.item, state="hidden")
+        self.on_leave()
+
+    def on_enter(self, _event: object = None) -> None:
+        if self.owned:
+            self.frame.config(bg="#f9f2d5", highlightbackground="#d8c270")
+            self.name_label.config(bg="#f9f2d5")
+
+    def on_leave(self, _event: object = None) -> None:
+        if self.owned:
+            self.frame.config(bg="#fffdf4", highlightbackground="#e7d78f")
+            self.name_label.config(bg="#fffdf4")
+
+    def on_click(self, _event: object = None) -> None:
+        if self.owned:
+            self.owner.open_card_preview(self.card_name)
+
+
 class FloatingTaskWidget:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
@@ -58,23 +2642,79 @@ class FloatingTaskWidget:
         self.root.attributes("-topmost", True)
         self.root.attributes("-alpha", 0.92)
 
-        self.tasks: list[dict[str, object]] = []
-        self.history: dict[str, dict[str, object]] = {}
+        self.tasks = TaskStore()
+        self.storage = open_storage()
+        # Built from every history day the first time the History window needs it, then kept current by
+        # add_interval_to_history; bulk history changes drop it so it is rebuilt on next use.
+        self.analytics: HistoryAnalytics | None = None
+        self.sessions = SessionLog(SESSIONS_FILE, SESSION_NAMES_FILE)
+        # Built from the session log on the first time-range query, then kept current by pause_task.
+        self.session_index: SessionIndex | None = None
         self.encouragements: list[str] = []
         self.card_state: dict[str, object] = {"unlocked": [], "awarded_dates": {}}
-        self.card_images_cache: dict[str, tk.PhotoImage] = {}
+        self.card_images_cache = ImageLRU(CARD_IMAGE_CACHE_BYTES)
+        self.thumb_cache = ThumbnailCache(THUMB_CACHE_DIR)
+        self.thumb_loader = ThumbnailLoader(self.thumb_cache, THUMBNAIL_WORKERS)
+        self.card_thumb_sizes: dict[str, tuple[int, int]] = {}
         self.library_window: tk.Toplevel | None = None
-        self.library_items_frame: tk.Frame | None = None
         self.library_count_label: tk.Label | None = None
         self.library_reflow_job: str | None = None
+        self.library_canvas: tk.Canvas | None = None
+        self.library_hint: tk.Label | None = None
+        # (card name, owned, thumbnail size) per Library card in display order, and the masonry geometry built
+        # from it: (x, y, width, height) per card plus, per column, its card indices and their bottom edges.
+        self.library_cards: list[tuple[str, bool, tuple[int, int]]] = []
+        self.library_boxes: list[tuple[float, int, float, int]] = []
+        self.library_column_cards: list[list[int]] = []
+        self.library_column_bottoms: list[list[int]] = []
+        self.library_key_index: dict[str, int] = {}
+        # Card name -> height its wrapped name adds beyond one line; measured once per name.
+        self.library_name_heights: dict[str, int] = {}
+        # Canvas width and column count the geometry was last built for, and the resulting content height.
+        self.library_layout_width = 0
+        self.library_layout_columns = 0
+        self.library_content_height = 0
+        # Only cards near the viewport have widgets; slots scrolled away go back to the free pool.
+        self.library_slots: dict[int, LibraryCardSlot] = {}
+        self.library_free_slots: list[LibraryCardSlot] = []
+        self.library_relayout_needed = False
+        # Cache key -> (card name, y offset) for thumbnails still decoding.
+        self.library_thumb_targets: dict[str, tuple[str, int]] = {}
+        self.card_thumb_failed: set[str] = set()
+        self.library_thumb_job: str | None = None
+        self.library_view_top: float | None = None
         self.preview_window: tk.Toplevel | None = None
+        self.history_window: tk.Toplevel | None = None
+        self.history_summary_label: tk.Label | None = None
+        self.history_list: tk.Listbox | None = None
+        self.history_details: tk.Text | None = None
+        self.history_dates: list[str] = []
+        self.history_exhausted = False
+        self.history_page_job: str | None = None
+        self.merge_queue: "queue.Queue[tuple[str, object]] | None" = None
+        self.merge_job: str | None = None
         self.note_windows: dict[str, tk.Toplevel] = {}
         self.note_text_widgets: dict[str, tk.Text] = {}
-        self.task_time_labels: dict[int, tk.Label] = {}
+        self.task_rows: dict[str, TaskRow] = {}
+        self.task_row_order: list[str] = []
+        self.task_empty_label: tk.Label | None = None
+        self.virtual_list_active = False
+        self.virtual_tasks: list[Task] = []
+        self.virtual_slots: list[tuple[tk.Frame, TaskRow, int]] = []
+        self.virtual_row_height = 0
+        self.virtual_first_index = -1
+        self.running_tasks: list[Task] = []
+        self.widget_options: dict[str, dict[str, object]] = {}
         self.timer_job: str | None = None
         self.show_completed = True
         self.goal_reached_today = False
         self.last_goal_date = datetime.now().strftime("%Y-%m-%d")
+        # Running aggregates: stored (paused) seconds across all tasks and today's recorded history total.
+        self.paused_total = 0.0
+        self.today_key = self.last_goal_date
+        self.today_start_ts = 0.0
+        self.tomorrow_start_ts = 0.0
+        self.today_base = 0.0
         self.milestones_reached_today: set[str] = set()
         self.celebration_window: tk.Toplevel | None = None
         self.firework_canvas: tk.Canvas | None = None
@@ -173,7 +2813,7 @@ class FloatingTaskWidget:
             relief="flat",
         )
         self.list_scrollbar = tk.Scrollbar(self.list_area, orient="vertical", command=self.list_canvas.yview)
-        self.list_canvas.configure(yscrollcommand=self.list_scrollbar.set)
+        self.list_canvas.configure(yscrollcommand=self._on_task_list_yview)
         self.list_canvas.pack(side="left", fill="both", expand=True)
         self.list_scrollbar.pack(side="right", fill="y")
 
@@ -237,6 +2877,19 @@ class FloatingTaskWidget:
         )
         export_btn.pack(side="left", padx=(8, 0))
 
+        backfill_btn = tk.Button(
+            footer_row2,
+            text="Backfill",
+            command=self.backfill_data,
+            relief="flat",
+            bd=0,
+            padx=10,
+            bg=self.soft_rose,
+            fg=self.text,
+            activebackground="#e8d5d8",
+        )
+        backfill_btn.pack(side="left", padx=(8, 0))
+
         history_btn = tk.Button(
             footer_row1,
             text="History",
@@ -264,7 +2917,6 @@ class FloatingTaskWidget:
         library_btn.pack(side="left", padx=(8, 0))
 
         self.load_tasks()
-        self.load_history()
         self.load_encouragements()
         self.ensure_cards_dir()
         self.load_card_state()
@@ -274,23 +2926,29 @@ class FloatingTaskWidget:
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def on_close(self) -> None:
-        for idx, _task in enumerate(self.tasks):
-            self.pause_task(idx)
-        self.save_tasks()
-        self.save_history()
+        for task in list(self.running_tasks):
+            self.pause_task(task.id)
         if self.timer_job is not None:
             self.root.after_cancel(self.timer_job)
             self.timer_job = None
         if self.library_reflow_job is not None:
             self.root.after_cancel(self.library_reflow_job)
             self.library_reflow_job = None
+        if self.merge_job is not None:
+            self.root.after_cancel(self.merge_job)
+            self.merge_job = None
+        self.cancel_library_thumbnails()
         self.close_all_note_windows()
         self.close_preview_window()
         if self.library_window is not None and self.library_window.winfo_exists():
             self.library_window.destroy()
         self.library_window = None
+        self.close_history_window()
         self.close_celebration_window()
         self._unbind_task_scroll()
+        # Last: closing the memo windows above still saves through the storage.
+        self.sessions.close()
+        self.storage.close(self.snapshot_tasks())
         self.root.destroy()
 
     def set_app_icon(self) -> None:
@@ -304,13 +2962,143 @@ class FloatingTaskWidget:
 
     def start_timer_loop(self) -> None:
         self.refresh_timer_labels()
-        self.timer_job = self.root.after(1000, self.start_timer_loop)
+        self.schedule_next_tick()
+
+    def on_timer_tick(self) -> None:
+        self.timer_job = None
+        self.refresh_timer_labels()
+        self.schedule_next_tick()
+
+    def schedule_next_tick(self) -> None:
+        if self.timer_job is not None:
+            self.root.after_cancel(self.timer_job)
+        delay = min(TIMER_MAX_SLEEP_SECONDS, self.seconds_until_next_change())
+        # Land just past the boundary so the formatted value has already rolled over.
+        self.timer_job = self.root.after(max(1, int(delay * 1000) + 5), self.on_timer_tick)
+
+    def seconds_until_next_change(self) -> float:
+        now_ts = self.now_ts()
+        delays = [max(0.0, self.tomorrow_start_ts - now_ts)]
+        rate = len(self.running_tasks)
+        if rate:
+            for task in self.running_tasks:
+                delays.append(self.seconds_to_next_whole(self.task_elapsed_seconds(task), 1))
+            delays.append(self.seconds_to_next_whole(self.current_total_seconds(now_ts), rate))
+            today_seconds = self.get_today_tracked_seconds()
+            delays.append(self.seconds_to_next_whole(today_seconds, rate))
+            for threshold in (START_SUCCESS_SECONDS, MID_GOAL_SECONDS, DAILY_GOAL_SECONDS):
+                if today_seconds < threshold:
+                    delays.append((threshold - today_seconds) / rate)
+                    break
+        return min(delays)
+
+    def config_if_changed(self, widget: tk.Widget, **options: object) -> None:
+        shown = self.widget_options.setdefault(str(widget), {})
+        changed = {key: value for key, value in options.items() if shown.get(key) != value}
+        if changed:
+            widget.config(**changed)
+            shown.update(changed)
 
     def _on_task_frame_configure(self, _event: object = None) -> None:
+        if self.virtual_list_active:
+            return
         self.list_canvas.configure(scrollregion=self.list_canvas.bbox("all"))
 
     def _on_task_canvas_configure(self, event: tk.Event) -> None:
         self.list_canvas.itemconfigure(self.list_canvas_window, width=event.width)
+        if self.virtual_list_active:
+            for _slot, _row, item in self.virtual_slots:
+                self.list_canvas.itemconfigure(item, width=event.width)
+            self._layout_virtual_rows(force=True)
+
+    def _on_task_list_yview(self, first: str, last: str) -> None:
+        self.list_scrollbar.set(first, last)
+        if self.virtual_list_active:
+            self._layout_virtual_rows()
+
+    def _add_virtual_slot(self) -> None:
+        slot = tk.Frame(self.list_canvas, bg=self.panel)
+        row = TaskRow(self, slot)
+        row.pack_at_end()
+        row.show_separator(True)
+        if self.virtual_row_height <= 0:
+            slot.update_idletasks()
+            self.virtual_row_height = max(24, slot.winfo_reqheight())
+        item = self.list_canvas.create_window(
+            (0, 0),
+            window=slot,
+            anchor="nw",
+            width=max(1, self.list_canvas.winfo_width()),
+            height=self.virtual_row_height,
+            state="hidden",
+        )
+        self.virtual_slots.append((slot, row, item))
+
+    def _clear_virtual_slots(self) -> None:
+        for slot, _row, item in self.virtual_slots:
+            self.list_canvas.delete(item)
+            slot.destroy()
+        self.virtual_slots = []
+        self.virtual_first_index = -1
+
+    def _layout_virtual_rows(self, force: bool = False) -> None:
+        if not self.virtual_slots:
+            self._add_virtual_slot()
+        row_h = self.virtual_row_height
+        count = len(self.virtual_tasks)
+        viewport_h = max(1, self.list_canvas.winfo_height())
+        wanted_slots = viewport_h // row_h + 2
+        while len(self.virtual_slots) < wanted_slots:
+            self._add_virtual_slot()
+            force = True
+
+        first_index = max(0, int(self.list_canvas.canvasy(0)) // row_h)
+        if not force and first_index == self.virtual_first_index:
+            return
+        self.virtual_first_index = first_index
+
+        # Only the slots are real widgets; each is moved to its row's y offset and rebound to that task.
+        self.task_rows = {}
+        for offset, (_slot, row, item) in enumerate(self.virtual_slots):
+            index = first_index + offset
+            if index >= count:
+                self.list_canvas.itemconfigure(item, state="hidden")
+                continue
+            task = self.virtual_tasks[index]
+            row.bind(task)
+            row.set_time_text(f"Time: {self.format_seconds(self.task_elapsed_seconds(task))}")
+            row.show_separator(index < count - 1)
+            self.list_canvas.coords(item, 0, index * row_h)
+            self.list_canvas.itemconfigure(item, state="normal")
+            self.task_rows[task.id] = row
+
+    def _render_virtual_tasks(self, visible: list[Task]) -> None:
+        if not self.virtual_list_active:
+            for row in self.task_rows.values():
+                row.destroy()
+            self.task_rows = {}
+            self.task_row_order = []
+            if self.task_empty_label is not None:
+                self.task_empty_label.destroy()
+                self.task_empty_label = None
+            self.list_canvas.itemconfigure(self.list_canvas_window, state="hidden")
+            self.virtual_list_active = True
+
+        self.virtual_tasks = visible
+        if not self.virtual_slots:
+            self._add_virtual_slot()
+        width = max(1, self.list_canvas.winfo_width())
+        self.list_canvas.configure(scrollregion=(0, 0, width, len(visible) * self.virtual_row_height))
+        self._layout_virtual_rows(force=True)
+        self.refresh_all_timer_labels()
+
+    def _leave_virtual_list(self) -> None:
+        self._clear_virtual_slots()
+        self.task_rows = {}
+        self.virtual_tasks = []
+        self.virtual_list_active = False
+        self.list_canvas.itemconfigure(self.list_canvas_window, state="normal")
+        self.list_canvas.yview_moveto(0)
 
     def _bind_task_scroll(self, _event: object = None) -> None:
         self.root.bind_all("<MouseWheel>", self._on_task_mousewheel)
@@ -353,98 +3141,63 @@ class FloatingTaskWidget:
         seconds = total % 60
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
+    @staticmethod
+    def seconds_to_next_whole(value: float, per_second: int) -> float:
+        # Time until a counter growing at per_second ticks over to the next displayed whole second.
+        return (math.floor(value) + 1 - value) / per_second
+
     @staticmethod
     def generate_task_id() -> str:
         return uuid.uuid4().hex
 
-    def task_elapsed_seconds(self, task: dict[str, object]) -> float:
-        elapsed = float(task.get("elapsed_seconds", 0))
-        if not bool(task.get("running", False)):
-            return elapsed
-        started_at = task.get("started_at")
-        if isinstance(started_at, (int, float)):
-            elapsed += max(0, self.now_ts() - float(started_at))
-        return elapsed
+    def task_elapsed_seconds(self, task: Task) -> float:
+        if not task.running or task.started_at is None:
+            return task.elapsed_seconds
+        return task.elapsed_seconds + max(0.0, self.now_ts() - task.started_at)
 
     def refresh_timer_labels(self) -> None:
-        total = 0.0
-        for idx, task in enumerate(self.tasks):
-            elapsed = self.task_elapsed_seconds(task)
-            total += elapsed
-            label = self.task_time_labels.get(idx)
-            if label is not None:
-                label.config(text=f"Time: {self.format_seconds(elapsed)}")
-        self.total_time_label.config(text=f"Total: {self.format_seconds(total)}")
+        # Per tick only running tasks can change; paused rows were set when they were (re)rendered.
+        for task in self.running_tasks:
+            row = self.task_rows.get(task.id)
+            if row is not None:
+                row.set_time_text(f"Time: {self.format_seconds(self.task_elapsed_seconds(task))}")
+        total = self.current_total_seconds(self.now_ts())
+        self.config_if_changed(self.total_time_label, text=f"Total: {self.format_seconds(total)}")
         self.update_daily_goal_ui()
 
+    def current_total_seconds(self, now_ts: float) -> float:
+        total = self.paused_total
+        for task in self.running_tasks:
+            if task.started_at is not None:
+                total += max(0.0, now_ts - task.started_at)
+        return total
+
+    def refresh_all_timer_labels(self) -> None:
+        self.running_tasks = [task for task in self.tasks if task.running]
+        for task_id, row in self.task_rows.items():
+            task = self.tasks.get(task_id)
+            if task is not None:
+                row.set_time_text(f"Time: {self.format_seconds(self.task_elapsed_seconds(task))}")
+        self.refresh_timer_labels()
+        # The set of running tasks may have changed, so the next interesting instant has to be recomputed.
+        self.schedule_next_tick()
+
     def load_tasks(self) -> None:
-        if not DATA_FILE.exists():
-            self.tasks = []
-            return
+        self.tasks = self.storage.load_tasks()
+        self.analytics = None
+        self.rebuild_totals()
 
-        try:
-            raw = json.loads(DATA_FILE.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, OSError):
-            self.tasks = []
-            return
-
-        if not isinstance(raw, list):
-            self.tasks = []
-            return
-
-        cleaned: list[dict[str, object]] = []
-        used_ids: set[str] = set()
-        for item in raw:
-            if isinstance(item, dict) and isinstance(item.get("text"), str):
-                txt = item["text"].strip()
-                if txt:
-                    done = bool(item.get("done", False))
-                    elapsed_raw = item.get("elapsed_seconds", 0)
-                    started_raw = item.get("started_at")
-                    running_raw = item.get("running", False)
-
-                    elapsed_seconds = float(elapsed_raw) if isinstance(elapsed_raw, (int, float)) else 0.0
-                    running = bool(running_raw) and not done
-                    started_at: float | None = None
-                    if running and isinstance(started_raw, (int, float)):
-                        started_at = float(started_raw)
-                    elif isinstance(started_raw, (int, float)) and not done:
-                        # Backward compatible: old data may store active start time without explicit running flag.
-                        # Convert it to paused + accumulated elapsed time to avoid auto-running after startup.
-                        elapsed_seconds += max(0, self.now_ts() - float(started_raw))
-                        started_at = None
-
-                    raw_id = item.get("id")
-                    task_id = str(raw_id).strip() if isinstance(raw_id, str) else ""
-                    if not task_id or task_id in used_ids:
-                        task_id = self.generate_task_id()
-                    used_ids.add(task_id)
-
-                    raw_note = item.get("note", "")
-                    note = str(raw_note) if isinstance(raw_note, str) else ""
-
-                    cleaned.append(
-                        {
-                            "id": task_id,
-                            "text": txt,
-                            "done": done,
-                            "elapsed_seconds": elapsed_seconds,
-                            "started_at": started_at,
-                            "running": running,
-                            "note": note,
-                        }
-                    )
-        self.tasks = cleaned
-
-    def load_history(self) -> None:
-        if not HISTORY_FILE.exists():
-            self.history = {}
-            return
-        try:
-            raw = json.loads(HISTORY_FILE.read_text(encoding="utf-8"))
-            self.history = raw if isinstance(raw, dict) else {}
-        except (json.JSONDecodeError, OSError):
-            self.history = {}
+    def rebuild_totals(self) -> None:
+        self.running_tasks = [task for task in self.tasks if task.running]
+        self.paused_total = sum(task.elapsed_seconds for task in self.tasks)
+        self.reset_today_base()
+
+    def reset_today_base(self) -> None:
+        now = datetime.now()
+        self.today_key = now.strftime("%Y-%m-%d")
+        self.today_start_ts = datetime.combine(now.date(), datetime.min.time()).timestamp()
+        self.tomorrow_start_ts = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()).timestamp()
+        self.today_base = self.storage.day_total(self.today_key)
 
     def load_encouragements(self) -> None:
         default_lines = [
@@ -475,36 +3228,31 @@ class FloatingTaskWidget:
 
     def load_card_state(self) -> None:
         default_state: dict[str, object] = {"unlocked": [], "awarded_dates": {}}
-        if not CARDS_STATE_FILE.exists():
+        raw = self.storage.load_card_state()
+        if not isinstance(raw, dict):
             self.card_state = default_state
             return
-
-        try:
-            raw = json.loads(CARDS_STATE_FILE.read_text(encoding="utf-8"))
-            if not isinstance(raw, dict):
-                self.card_state = default_state
-                return
-            unlocked = raw.get("unlocked", [])
-            awarded_dates = raw.get("awarded_dates", {})
-            if not isinstance(unlocked, list) or not isinstance(awarded_dates, dict):
-                self.card_state = default_state
-                return
-            clean_unlocked = [str(x) for x in unlocked if str(x).strip()]
-            clean_awarded_dates: dict[str, str] = {}
-            for key, value in awarded_dates.items():
-                k = str(key).strip()
-                v = str(value).strip()
-                if k and v:
-                    clean_awarded_dates[k] = v
-            self.card_state = {"unlocked": clean_unlocked, "awarded_dates": clean_awarded_dates}
-        except (json.JSONDecodeError, OSError):
+        unlocked = raw.get("unlocked", [])
+        awarded_dates = raw.get("awarded_dates", {})
+        if not isinstance(unlocked, list) or not isinstance(awarded_dates, dict):
             self.card_state = default_state
+            return
+        clean_unlocked = [str(x) for x in unlocked if str(x).strip()]
+        clean_awarded_dates: dict[str, str] = {}
+        for key, value in awarded_dates.items():
+            k = str(key).strip()
+            v = str(value).strip()
+            if k and v:
+                clean_awarded_dates[k] = v
+        self.card_state = {"unlocked": clean_unlocked, "awarded_dates": clean_awarded_dates}
 
     def save_card_state(self) -> None:
-        try:
-            CARDS_STATE_FILE.write_text(json.dumps(self.card_state, indent=2, ensure_ascii=False), encoding="utf-8")
-        except OSError:
-            pass
+        awarded_dates = self.card_state.get("awarded_dates", {})
+        snapshot = {
+            "unlocked": list(self.card_state.get("unlocked", [])),
+            "awarded_dates": dict(awarded_dates) if isinstance(awarded_dates, dict) else {},
+        }
+        self.storage.save_card_state(snapshot)
 
     def get_card_pool(self) -> list[str]:
         exts = {".png", ".gif", ".jpg", ".jpeg", ".bmp", ".webp"}
@@ -547,87 +3295,76 @@ class FloatingTaskWidget:
         return f"New card unlocked: {picked}"
 
     def get_today_tracked_seconds(self) -> float:
-        now = datetime.now()
-        today_key = now.strftime("%Y-%m-%d")
-        today_total = float(self.history.get(today_key, {}).get("total_seconds", 0.0))
-        day_start_ts = datetime.combine(now.date(), datetime.min.time()).timestamp()
         now_ts = self.now_ts()
+        if now_ts >= self.tomorrow_start_ts:
+            self.reset_today_base()
 
-        for task in self.tasks:
-            if not bool(task.get("running", False)):
-                continue
-            started_at = task.get("started_at")
-            if not isinstance(started_at, (int, float)):
+        today_total = self.today_base
+        for task in self.running_tasks:
+            if task.started_at is None:
                 continue
-            active_start = max(float(started_at), day_start_ts)
+            active_start = max(task.started_at, self.today_start_ts)
             today_total += max(0.0, now_ts - active_start)
         return today_total
 
     def update_daily_goal_ui(self) -> None:
-        today_key = datetime.now().strftime("%Y-%m-%d")
+        today_seconds = self.get_today_tracked_seconds()
+        today_key = self.today_key
         if today_key != self.last_goal_date:
             self.last_goal_date = today_key
             self.goal_reached_today = False
             self.milestones_reached_today = set()
-            self.goal_message_label.config(
-                text="Step goals: 2h start success, 5h strong progress, 6.5h full goal.",
-                fg=self.muted,
-            )
-            self.today_progress_label.config(fg=self.muted)
-            self.total_time_label.config(fg=self.text)
-
-        today_seconds = self.get_today_tracked_seconds()
-        self.today_progress_label.config(
-            text=f"Today: {self.format_seconds(today_seconds)} / {self.format_seconds(DAILY_GOAL_SECONDS)}"
-        )
 
+        # Work out the target look first and push it once; labels are only touched when something differs.
+        celebration_message: str | None = None
         if today_seconds >= DAILY_GOAL_SECONDS:
-            self.today_progress_label.config(fg="#2f7d4f")
-            self.total_time_label.config(fg="#2f7d4f")
+            tier_fg = "#2f7d4f"
+            total_fg = tier_fg
             if not self.goal_reached_today:
                 self.goal_reached_today = True
                 self.milestones_reached_today.add("2h")
                 self.milestones_reached_today.add("5h")
                 message = random.choice(self.encouragements) if self.encouragements else "Great work today."
-                self.goal_message_label.config(text=f"Goal reached: {message}", fg="#2f7d4f")
-                reward_text = self.award_daily_card(today_key)
-                self.open_celebration_window(message, reward_text)
+                goal_text = f"Goal reached: {message}"
+                celebration_message = message
             else:
-                self.goal_message_label.config(text="Full goal reached. Enjoy your reward.", fg="#2f7d4f")
+                goal_text = "Full goal reached. Enjoy your reward."
         elif today_seconds >= MID_GOAL_SECONDS:
-            self.today_progress_label.config(fg="#3a6ea5")
-            self.total_time_label.config(fg="#3a6ea5")
-            if "2h" not in self.milestones_reached_today:
-                self.milestones_reached_today.add("2h")
+            tier_fg = "#3a6ea5"
+            total_fg = tier_fg
+            self.milestones_reached_today.add("2h")
             if "5h" not in self.milestones_reached_today:
                 self.milestones_reached_today.add("5h")
-                self.goal_message_label.config(text="Strong progress unlocked at 5h. You are on fire.", fg="#3a6ea5")
+                goal_text = "Strong progress unlocked at 5h. You are on fire."
             else:
                 remaining = DAILY_GOAL_SECONDS - today_seconds
-                self.goal_message_label.config(
-                    text=f"Great momentum: {self.format_seconds(remaining)} left to full goal.",
-                    fg="#3a6ea5",
-                )
+                goal_text = f"Great momentum: {self.format_seconds(remaining)} left to full goal."
         elif today_seconds >= START_SUCCESS_SECONDS:
-            self.today_progress_label.config(fg="#8a6d3b")
-            self.total_time_label.config(fg="#8a6d3b")
+            tier_fg = "#8a6d3b"
+            total_fg = tier_fg
             if "2h" not in self.milestones_reached_today:
                 self.milestones_reached_today.add("2h")
-                self.goal_message_label.config(text="Startup success unlocked at 2h. Nice beginning.", fg="#8a6d3b")
+                goal_text = "Startup success unlocked at 2h. Nice beginning."
             else:
                 remaining = MID_GOAL_SECONDS - today_seconds
-                self.goal_message_label.config(
-                    text=f"Startup success achieved. {self.format_seconds(remaining)} to reach 5h.",
-                    fg="#8a6d3b",
-                )
+                goal_text = f"Startup success achieved. {self.format_seconds(remaining)} to reach 5h."
         else:
-            self.today_progress_label.config(fg=self.muted)
-            self.total_time_label.config(fg=self.text)
+            tier_fg = self.muted
+            total_fg = self.text
             remaining = START_SUCCESS_SECONDS - today_seconds
-            self.goal_message_label.config(
-                text=f"First step: {self.format_seconds(remaining)} left to unlock startup success (2h).",
-                fg=self.muted,
-            )
+            goal_text = f"First step: {self.format_seconds(remaining)} left to unlock startup success (2h)."
+
+        self.config_if_changed(
+            self.today_progress_label,
+            text=f"Today: {self.format_seconds(today_seconds)} / {self.format_seconds(DAILY_GOAL_SECONDS)}",
+            fg=tier_fg,
+        )
+        self.config_if_changed(self.total_time_label, fg=total_fg)
+        self.config_if_changed(self.goal_message_label, text=goal_text, fg=tier_fg)
+
+        if celebration_message is not None:
+            reward_text = self.award_daily_card(today_key)
+            self.open_celebration_window(celebration_message, reward_text)
 
     def open_celebration_window(self, message: str, reward_text: str) -> None:
         if self.celebration_window is not None and self.celebration_window.winfo_exists():
@@ -776,83 +3513,149 @@ class FloatingTaskWidget:
                 }
             )
 
-    def pause_task(self, idx: int) -> None:
-        task = self.tasks[idx]
-        if not bool(task.get("running", False)):
+    def pause_task(self, task_id: str) -> None:
+        task = self.tasks.get(task_id)
+        if task is None or not task.running:
             return
-        elapsed = float(task.get("elapsed_seconds", 0))
-        started_at = task.get("started_at")
-        if isinstance(started_at, (int, float)):
-            start_ts = float(started_at)
+        start_ts = task.started_at
+        end_ts: float | None = None
+        if start_ts is not None:
             end_ts = self.now_ts()
-            elapsed += max(0, end_ts - start_ts)
-            self.add_interval_to_history(start_ts, end_ts, str(task.get("text", "Untitled Task")))
-        task["elapsed_seconds"] = elapsed
-        task["started_at"] = None
-        task["running"] = False
+            spent = max(0.0, end_ts - start_ts)
+            task.elapsed_seconds += spent
+            self.paused_total += spent
+            self.add_interval_to_history(start_ts, end_ts, task.text)
+            self.sessions.append(start_ts, end_ts, task_id, task.text)
+            if self.session_index is not None:
+                self.session_index.add(start_ts, end_ts, session_task_key(task_id).hex())
+        task.started_at = None
+        task.running = False
+        self.record_event(
+            "paused",
+            id=task_id,
+            text=task.text,
+            start=start_ts,
+            end=end_ts,
+        )
 
-    def add_interval_to_history(self, start_ts: float, end_ts: float, task_text: str) -> None:
-        if end_ts <= start_ts:
+    def backfill_intervals(self, intervals: list[tuple[float, float, str]]) -> float:
+        # Splits the whole batch at day boundaries in one pass, merges it into history and checkpoints once.
+        rows = aggregate_intervals(intervals)
+        if not rows:
+            return 0.0
+        self.storage.add_day_seconds_batch(rows)
+        self.storage.checkpoint(self.snapshot_tasks())
+        # Backfilled intervals have no task id; key their sessions by name instead.
+        self.sessions.extend(
+            [(start_ts, end_ts, f"backfill:{task_text}", task_text) for start_ts, end_ts, task_text in intervals]
+        )
+        self.session_index = None
+        self.analytics = None
+        self.reset_today_base()
+        return sum(rows.values())
+
+    def backfill_data(self) -> None:
+        selected = filedialog.askopenfilename(
+            title="Select intervals to backfill (CSV or JSON lines with start, end, task)",
+            filetypes=[("Interval files", "*.csv *.jsonl"), ("All files", "*.*")],
+        )
+        if not selected:
+            self.status.config(text="Backfill cancelled.")
+            return
+        try:
+            intervals, skipped = read_interval_file(Path(selected))
+        except (OSError, UnicodeDecodeError, csv.Error):
+            self.status.config(text="Backfill failed: could not read file.")
             return
+        added = self.backfill_intervals(intervals)
+        self.refresh_timer_labels()
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.reload_history_window()
+        note = f", skipped {skipped}" if skipped else ""
+        self.status.config(text=f"Backfilled {len(intervals)} intervals ({self.format_seconds(added)}){note}.")
+
+    def get_analytics(self) -> HistoryAnalytics:
+        if self.analytics is None:
+            self.analytics = HistoryAnalytics()
+            self.analytics.rebuild(self.storage.day_totals())
+        return self.analytics
+
+    def get_session_index(self) -> SessionIndex:
+        if self.session_index is None:
+            self.session_index = SessionIndex.from_sessions(self.sessions.iter_sessions())
+        return self.session_index
+
+    def tracked_seconds_between(self, start_ts: float, end_ts: float) -> float:
+        total = self.get_session_index().overlap_seconds(start_ts, end_ts)
+        now_ts = self.now_ts()
+        for task in self.running_tasks:
+            if task.started_at is not None:
+                total += max(0.0, min(now_ts, end_ts) - max(task.started_at, start_ts))
+        return total
+
+    def tasks_running_at(self, ts: float) -> list[str]:
+        names = [self.sessions.task_name(key) for _start, _end, key in self.get_session_index().stab(ts)]
+        now_ts = self.now_ts()
+        for task in self.running_tasks:
+            if task.started_at is not None and task.started_at <= ts <= now_ts:
+                names.append(task.text)
+        return names
+
+    def hour_of_day_profile(self, days: int) -> list[float]:
+        # Average seconds tracked in each hour of the day over the last `days` days, today included.
+        today = datetime.now().date()
+        totals = [0.0] * 24
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            for hour in range(24):
+                start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+                end = start + timedelta(hours=1)
+                totals[hour] += self.tracked_seconds_between(start.timestamp(), end.timestamp())
+        return [total / days for total in totals] if days > 0 else totals
 
-        cursor = datetime.fromtimestamp(start_ts)
-        end_dt = datetime.fromtimestamp(end_ts)
-
-        while cursor < end_dt:
-            next_midnight = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time())
-            segment_end = min(next_midnight, end_dt)
-            seconds = (segment_end - cursor).total_seconds()
-            if seconds > 0:
-                date_key = cursor.strftime("%Y-%m-%d")
-                day = self.history.setdefault(date_key, {"total_seconds": 0.0, "tasks": {}})
-                day["total_seconds"] = float(day.get("total_seconds", 0.0)) + seconds
-                tasks = day.setdefault("tasks", {})
-                tasks[task_text] = float(tasks.get(task_text, 0.0)) + seconds
-            cursor = segment_end
-
-    def pause_all_running_except(self, keep_idx: int) -> None:
-        for idx, _task in enumerate(self.tasks):
-            if idx != keep_idx:
-                self.pause_task(idx)
-
-    def toggle_run_task(self, idx: int) -> None:
-        task = self.tasks[idx]
-        if bool(task.get("done", False)):
+    def add_interval_to_history(self, start_ts: float, end_ts: float, task_text: str) -> None:
+        for date_key, seconds in split_interval_by_day(start_ts, end_ts):
+            self.storage.add_day_seconds(date_key, task_text, seconds)
+            if self.analytics is not None:
+                self.analytics.add(date_key, seconds)
+            if date_key == self.today_key:
+                self.today_base += seconds
+
+    def pause_all_running_except(self, keep_id: str) -> None:
+        for task in list(self.running_tasks):
+            if task.id != keep_id:
+                self.pause_task(task.id)
+
+    def toggle_run_task(self, task_id: str) -> None:
+        task = self.tasks.get(task_id)
+        if task is None:
+            self.status.config(text="Task not found.")
+            return
+        if task.done:
             self.status.config(text="Completed task cannot start. Uncheck first.")
             return
 
-        if bool(task.get("running", False)):
-            self.pause_task(idx)
-            self.status.config(text=f'Paused: "{task["text"]}"')
+        if task.running:
+            self.pause_task(task_id)
+            self.status.config(text=f'Paused: "{task.text}"')
         else:
-            self.pause_all_running_except(idx)
-            task["running"] = True
-            task["started_at"] = self.now_ts()
-            self.status.config(text=f'Started: "{task["text"]}"')
-        self.save_tasks()
-        self.save_history()
+            self.pause_all_running_except(task_id)
+            task.running = True
+            task.started_at = self.now_ts()
+            self.record_event("started", id=task_id, started_at=task.started_at)
+            self.status.config(text=f'Started: "{task.text}"')
         self.render_tasks()
 
-    def save_tasks(self) -> None:
-        try:
-            DATA_FILE.write_text(json.dumps(self.tasks, indent=2, ensure_ascii=False), encoding="utf-8")
-        except OSError:
-            pass
-
-    def save_history(self) -> None:
-        try:
-            HISTORY_FILE.write_text(json.dumps(self.history, indent=2, ensure_ascii=False), encoding="utf-8")
-        except OSError:
-            pass
+    def snapshot_tasks(self) -> list[dict[str, object]]:
+        # Tasks hold only scalar values, so serializing each one fully detaches it from the UI thread.
+        return [task.to_dict() for task in self.tasks]
 
-    def find_task_index_by_id(self, task_id: str) -> int | None:
-        for idx, task in enumerate(self.tasks):
-            if str(task.get("id", "")) == task_id:
-                return idx
-        return None
+    def record_event(self, kind: str, **fields: object) -> None:
+        if self.storage.record({"event": kind, **fields}):
+            self.storage.checkpoint(self.snapshot_tasks())
 
-    def task_has_note(self, task: dict[str, object]) -> bool:
-        return bool(str(task.get("note", "")).strip())
+    def task_has_note(self, task: Task) -> bool:
+        return self.storage.has_note(task.id)
 
     def open_task_note_window(self, task_id: str) -> None:
         existing = self.note_windows.get(task_id)
@@ -861,12 +3664,11 @@ class FloatingTaskWidget:
             existing.focus_force()
             return
 
-        idx = self.find_task_index_by_id(task_id)
-        if idx is None:
+        task = self.tasks.get(task_id)
+        if task is None:
             self.status.config(text="Task not found.")
             return
-        task = self.tasks[idx]
-        task_name = str(task.get("text", "Untitled Task"))
+        task_name = task.text
 
         win = tk.Toplevel(self.root)
         win.title(f"Memo - {task_name}")
@@ -894,31 +3696,150 @@ class FloatingTaskWidget:
             bg="#fffdf8",
             fg=self.text,
             relief="flat",
-            bd=0,
+            bd=0,
+            highlightthickness=1,
+            highlightbackground=self.line,
+            insertbackground=self.text,
+            padx=8,
+            pady=8,
+            undo=True,
+        )
+        text_widget.pack(fill="both", expand=True)
+        text_widget.insert("1.0", self.storage.load_note(task_id))
+        text_widget.edit_modified(False)
+        text_widget.focus_set()
+
+        footer = tk.Frame(wrap, bg="#f5f1e8")
+        footer.pack(fill="x", pady=(8, 0))
+        tk.Label(
+            footer,
+            text="Tip: Cmd/Ctrl+S to save",
+            bg="#f5f1e8",
+            fg=self.muted,
+            anchor="w",
+        ).pack(side="left")
+        tk.Button(
+            footer,
+            text="Save",
+            command=lambda t_id=task_id: self.save_task_note(t_id),
+            relief="flat",
+            bd=0,
+            padx=10,
+            bg=self.soft_blue,
+            fg=self.text,
+            activebackground="#ccdce8",
+        ).pack(side="right")
+        tk.Button(
+            footer,
+            text="Close",
+            command=lambda t_id=task_id: self.close_task_note_window(t_id, save=True),
+            relief="flat",
+            bd=0,
+            padx=10,
+            bg=self.soft_rose,
+            fg=self.text,
+            activebackground="#e8d5d8",
+        ).pack(side="right", padx=(0, 6))
+        tk.Button(
+            footer,
+            text="History",
+            command=lambda t_id=task_id: self.open_note_history_window(t_id),
+            relief="flat",
+            bd=0,
+            padx=10,
+            bg=self.soft_green,
+            fg=self.text,
+            activebackground="#d2e3d8",
+        ).pack(side="right", padx=(0, 6))
+
+        win.bind("<Command-s>", lambda _event, t_id=task_id: self.save_task_note(t_id))
+        win.bind("<Control-s>", lambda _event, t_id=task_id: self.save_task_note(t_id))
+        win.protocol("WM_DELETE_WINDOW", lambda t_id=task_id: self.close_task_note_window(t_id, save=True))
+
+        self.note_windows[task_id] = win
+        self.note_text_widgets[task_id] = text_widget
+        self.status.config(text=f'Opened memo: "{task_name}"')
+
+    def open_note_history_window(self, task_id: str) -> None:
+        note_win = self.note_windows.get(task_id)
+        text_widget = self.note_text_widgets.get(task_id)
+        task = self.tasks.get(task_id)
+        if note_win is None or text_widget is None or task is None or not note_win.winfo_exists():
+            return
+        revisions = self.storage.note_revisions(task_id)
+        if not revisions:
+            self.status.config(text="No saved memo revisions yet.")
+            return
+
+        win = tk.Toplevel(note_win)
+        win.title(f"Memo History - {task.text}")
+        win.geometry("620x420")
+        win.minsize(480, 320)
+        win.configure(bg="#f5f1e8")
+
+        wrap = tk.Frame(win, bg="#f5f1e8", padx=12, pady=12)
+        wrap.pack(fill="both", expand=True)
+
+        body = tk.Frame(wrap, bg="#f5f1e8")
+        body.pack(fill="both", expand=True)
+
+        rev_list = tk.Listbox(
+            body,
+            exportselection=False,
+            bg="#fffdf8",
+            fg=self.text,
+            highlightthickness=1,
+            highlightbackground=self.line,
+            relief="flat",
+            width=22,
+        )
+        rev_list.pack(side="left", fill="y")
+
+        preview = tk.Text(
+            body,
+            wrap="word",
+            bg="#fffdf8",
+            fg=self.text,
+            relief="flat",
             highlightthickness=1,
             highlightbackground=self.line,
-            insertbackground=self.text,
             padx=8,
             pady=8,
-            undo=True,
         )
-        text_widget.pack(fill="both", expand=True)
-        text_widget.insert("1.0", str(task.get("note", "")))
-        text_widget.focus_set()
+        preview.pack(side="left", fill="both", expand=True, padx=(8, 0))
+        preview.config(state="disabled")
+
+        for rev, saved_at in revisions:
+            rev_list.insert("end", f"#{rev + 1}  {datetime.fromtimestamp(saved_at).strftime('%Y-%m-%d %H:%M')}")
+
+        def show_selected(_event: object = None) -> None:
+            sel = rev_list.curselection()
+            if not sel:
+                return
+            # Rebuilt on demand from the nearest keyframe; nothing but the list of revisions is loaded upfront.
+            text = self.storage.load_note_revision(task_id, revisions[sel[0]][0])
+            preview.config(state="normal")
+            preview.delete("1.0", "end")
+            preview.insert("1.0", text)
+            preview.config(state="disabled")
+
+        def restore_selected() -> None:
+            sel = rev_list.curselection()
+            if not sel or not text_widget.winfo_exists():
+                return
+            rev = revisions[sel[0]][0]
+            text_widget.delete("1.0", "end")
+            text_widget.insert("1.0", self.storage.load_note_revision(task_id, rev))
+            text_widget.edit_modified(True)
+            win.destroy()
+            self.status.config(text=f"Restored memo revision #{rev + 1}. Save to keep it.")
 
         footer = tk.Frame(wrap, bg="#f5f1e8")
         footer.pack(fill="x", pady=(8, 0))
-        tk.Label(
-            footer,
-            text="Tip: Cmd/Ctrl+S to save",
-            bg="#f5f1e8",
-            fg=self.muted,
-            anchor="w",
-        ).pack(side="left")
         tk.Button(
             footer,
-            text="Save",
-            command=lambda t_id=task_id: self.save_task_note(t_id),
+            text="Restore",
+            command=restore_selected,
             relief="flat",
             bd=0,
             padx=10,
@@ -926,38 +3847,23 @@ class FloatingTaskWidget:
             fg=self.text,
             activebackground="#ccdce8",
         ).pack(side="right")
-        tk.Button(
-            footer,
-            text="Close",
-            command=lambda t_id=task_id: self.close_task_note_window(t_id, save=True),
-            relief="flat",
-            bd=0,
-            padx=10,
-            bg=self.soft_rose,
-            fg=self.text,
-            activebackground="#e8d5d8",
-        ).pack(side="right", padx=(0, 6))
 
-        win.bind("<Command-s>", lambda _event, t_id=task_id: self.save_task_note(t_id))
-        win.bind("<Control-s>", lambda _event, t_id=task_id: self.save_task_note(t_id))
-        win.protocol("WM_DELETE_WINDOW", lambda t_id=task_id: self.close_task_note_window(t_id, save=True))
-
-        self.note_windows[task_id] = win
-        self.note_text_widgets[task_id] = text_widget
-        self.status.config(text=f'Opened memo: "{task_name}"')
+        rev_list.bind("<<ListboxSelect>>", show_selected)
+        rev_list.selection_set(0)
+        show_selected()
 
     def save_task_note(self, task_id: str) -> None:
         text_widget = self.note_text_widgets.get(task_id)
         if text_widget is None or not text_widget.winfo_exists():
             return
-        idx = self.find_task_index_by_id(task_id)
-        if idx is None:
+        task = self.tasks.get(task_id)
+        if task is None:
             return
-        note_text = text_widget.get("1.0", "end-1c")
-        self.tasks[idx]["note"] = note_text
-        self.save_tasks()
-        self.render_tasks()
-        self.status.config(text=f'Saved memo: "{self.tasks[idx]["text"]}"')
+        if text_widget.edit_modified():
+            # Only this memo is written; the task snapshot and the row list are untouched.
+            self.storage.save_note(task_id, text_widget.get("1.0", "end-1c"))
+            text_widget.edit_modified(False)
+        self.status.config(text=f'Saved memo: "{task.text}"')
 
     def close_task_note_window(self, task_id: str, save: bool) -> None:
         if save:
@@ -979,47 +3885,39 @@ class FloatingTaskWidget:
             self.status.config(text="Please type a task first.")
             return
 
-        self.tasks.append(
-            {
-                "id": self.generate_task_id(),
-                "text": text,
-                "done": False,
-                "elapsed_seconds": 0.0,
-                "started_at": None,
-                "running": False,
-                "note": "",
-            }
-        )
+        task_id = self.generate_task_id()
+        self.tasks.append(Task(task_id, text))
         self.task_var.set("")
-        self.save_tasks()
+        self.record_event("task_added", id=task_id, text=text)
         self.render_tasks()
         self.status.config(text=f'Added: "{text}"')
 
-    def toggle_task(self, idx: int) -> None:
-        task = self.tasks[idx]
-        done = bool(task.get("done", False))
-
-        if done:
-            task["done"] = False
-            task["running"] = False
-            task["started_at"] = None
-            self.status.config(text=f'Reopened: "{task["text"]}"')
+    def toggle_task(self, task_id: str) -> None:
+        task = self.tasks.get(task_id)
+        if task is None:
+            self.status.config(text="Task not found.")
+            return
+        if task.done:
+            task.done = False
+            task.running = False
+            task.started_at = None
+            self.status.config(text=f'Reopened: "{task.text}"')
         else:
-            self.pause_task(idx)
-            task["done"] = True
-            self.status.config(text=f'Completed: "{task["text"]}"')
-        self.save_tasks()
-        self.save_history()
+            self.pause_task(task_id)
+            task.done = True
+            self.status.config(text=f'Completed: "{task.text}"')
+        self.record_event("done_toggled", id=task_id, done=task.done)
         self.render_tasks()
 
-    def delete_task(self, idx: int) -> None:
-        task_id = str(self.tasks[idx].get("id", ""))
-        if task_id:
-            self.close_task_note_window(task_id, save=False)
-        self.pause_task(idx)
-        self.tasks.pop(idx)
-        self.save_tasks()
-        self.save_history()
+    def delete_task(self, task_id: str) -> None:
+        if task_id not in self.tasks:
+            self.status.config(text="Task not found.")
+            return
+        self.close_task_note_window(task_id, save=False)
+        self.pause_task(task_id)
+        removed = self.tasks.remove(task_id)
+        self.paused_total -= removed.elapsed_seconds
+        self.record_event("task_deleted", id=task_id)
         self.render_tasks()
 
     def toggle_completed_visibility(self) -> None:
@@ -1058,90 +3956,334 @@ class FloatingTaskWidget:
             if candidate_history.exists():
                 src_history = candidate_history
 
+        if src_tasks is None and src_history is None:
+            self.status.config(text="No tasks.json/history.json found in selected folder.")
+            return
+
+        merge = messagebox.askyesnocancel(
+            "Import Data",
+            "Merge the selected files into your local data?\n\n"
+            "Yes: add their history and any new tasks to what you already have.\n"
+            "No: replace your local tasks/history with the selected files.",
+            parent=self.root,
+        )
+        if merge is None:
+            self.status.config(text="Import cancelled.")
+            return
+        if merge:
+            self.start_merge_import(src_tasks, src_history)
+            return
+
         copied: list[str] = []
+        imported_tasks: list[Task] | None = None
+        imported_notes: dict[str, str] = {}
+        imported_history: dict[str, object] | None = None
 
         try:
             if src_tasks is not None and src_tasks.exists():
-                DATA_FILE.write_text(src_tasks.read_text(encoding="utf-8"), encoding="utf-8")
-                copied.append("tasks")
+                raw_tasks = json.loads(src_tasks.read_text(encoding="utf-8"))
+                if isinstance(raw_tasks, list):
+                    imported_tasks = clean_tasks(raw_tasks, imported_notes)
+                    copied.append("tasks")
             if src_history is not None and src_history.exists():
-                HISTORY_FILE.write_text(src_history.read_text(encoding="utf-8"), encoding="utf-8")
-                copied.append("history")
+                raw_history = json.loads(src_history.read_text(encoding="utf-8"))
+                if isinstance(raw_history, dict):
+                    imported_history = raw_history
+                    copied.append("history")
         except OSError:
             self.status.config(text="Import failed: file permission error.")
             return
+        except json.JSONDecodeError:
+            self.status.config(text="Import failed: file is not valid JSON.")
+            return
 
         if not copied:
             self.status.config(text="No tasks.json/history.json found in selected folder.")
             return
 
+        # Settle local state first so that replacing one file never drops pending changes to the other.
+        self.close_all_note_windows()
+        self.storage.checkpoint(self.snapshot_tasks())
+        if imported_history is not None and src_history is not None:
+            self.storage.replace_history(imported_history)
+            self.sessions.replace(src_history.parent)
+            self.session_index = None
+        if imported_tasks is not None:
+            self.storage.replace_tasks([task.to_dict() for task in imported_tasks])
+            self.storage.replace_notes(imported_notes)
         self.load_tasks()
-        self.load_history()
         self.load_encouragements()
         self.render_tasks()
         self.status.config(text=f"Imported: {', '.join(copied)}.")
 
+    def start_merge_import(self, src_tasks: Path | None, src_history: Path | None) -> None:
+        if self.merge_queue is not None:
+            self.status.config(text="An import is already running.")
+            return
+        # The files are parsed on a worker thread; storage is only touched from the UI thread once it is done.
+        self.merge_queue = queue.Queue()
+        worker = threading.Thread(
+            target=self.run_merge_scan,
+            args=(src_tasks, src_history, set(self.tasks.ids()), self.merge_queue),
+            name="planner-merge-import",
+            daemon=True,
+        )
+        worker.start()
+        self.status.config(text="Merging import… 0%")
+        self.merge_job = self.root.after(100, self.poll_merge_import)
+
+    @staticmethod
+    def run_merge_scan(
+        src_tasks: Path | None,
+        src_history: Path | None,
+        known_ids: set[str],
+        results: "queue.Queue[tuple[str, object]]",
+    ) -> None:
+        try:
+            scanned = scan_merge_sources(
+                src_tasks, src_history, known_ids, lambda fraction: results.put(("progress", fraction))
+            )
+        except OSError:
+            results.put(("error", "file permission error"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            results.put(("error", "file is not valid JSON"))
+        except Exception as exc:
+            # Anything else still has to reach the poller, or the import would count as running forever.
+            results.put(("error", f"unexpected {type(exc).__name__}"))
+        else:
+            results.put(("done", scanned))
+
+    def poll_merge_import(self) -> None:
+        self.merge_job = None
+        if self.merge_queue is None:
+            return
+        try:
+            while True:
+                kind, payload = self.merge_queue.get_nowait()
+                if kind == "progress" and isinstance(payload, float):
+                    self.status.config(text=f"Merging import… {int(payload * 100)}%")
+                    continue
+                try:
+                    if kind == "done" and isinstance(payload, tuple):
+                        self.apply_merge_import(*payload)
+                    else:
+                        self.status.config(text=f"Import failed: {payload}.")
+                finally:
+                    self.merge_queue = None
+                return
+        except queue.Empty:
+            pass
+        self.merge_job = self.root.after(100, self.poll_merge_import)
+
+    def apply_merge_import(self, rows: dict[tuple[str, str], float], raw_tasks: list[dict[str, object]]) -> None:
+        notes: dict[str, str] = {}
+        added_ids: set[str] = set()
+        for task in clean_tasks(raw_tasks, notes):
+            # Tasks may have been added locally while the files were being scanned.
+            if task.id in self.tasks:
+                continue
+            # A timer left running on the other machine is not running here.
+            task.running = False
+            task.started_at = None
+            self.tasks.append(task)
+            added_ids.add(task.id)
+        for task_id, note in notes.items():
+            if task_id in added_ids:
+                self.storage.save_note(task_id, note)
+        self.storage.add_day_seconds_batch(rows)
+        self.storage.checkpoint(self.snapshot_tasks())
+
+        self.rebuild_totals()
+        self.analytics = None
+        self.render_tasks()
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.reload_history_window()
+        merged_time = self.format_seconds(sum(rows.values()))
+        self.status.config(text=f"Merged: {len(added_ids)} new tasks, {merged_time} of history.")
+
     def export_data(self) -> None:
         target_dir = filedialog.askdirectory(title="Select export folder")
         if not target_dir:
             self.status.config(text="Export cancelled.")
             return
 
-        # Ensure the latest in-memory state is written before export.
-        self.save_tasks()
-        self.save_history()
-
+        # Export the latest in-memory state rather than whatever the backend last persisted.
         dst = Path(target_dir)
         dst_tasks = dst / "tasks.json"
         dst_history = dst / "history.json"
         exported: list[str] = []
 
         try:
-            if DATA_FILE.exists():
-                dst_tasks.write_text(DATA_FILE.read_text(encoding="utf-8"), encoding="utf-8")
-                exported.append("tasks")
-            if HISTORY_FILE.exists():
-                dst_history.write_text(HISTORY_FILE.read_text(encoding="utf-8"), encoding="utf-8")
-                exported.append("history")
+            # Exports keep memos inline so they stay readable by older versions and other machines.
+            tasks = self.snapshot_tasks()
+            notes = self.storage.export_notes()
+            for task in tasks:
+                note = notes.get(str(task["id"]))
+                if note is not None:
+                    task["note"] = note
+            atomic_write_text(dst_tasks, json.dumps(tasks, indent=2, ensure_ascii=False))
+            exported.append("tasks")
+            atomic_write_text(dst_history, json.dumps(self.storage.export_history(), indent=2, ensure_ascii=False))
+            exported.append("history")
+            # Raw intervals let `app.py merge` tell shared time from new time when combining exports.
+            if SESSIONS_FILE.exists():
+                atomic_write_bytes(dst / SESSIONS_FILE.name, SESSIONS_FILE.read_bytes())
+                atomic_write_text(dst / SESSION_NAMES_FILE.name, json.dumps(self.sessions.names, indent=2))
+                exported.append("sessions")
         except OSError:
             self.status.config(text="Export failed: file permission error.")
             return
 
-        if not exported:
-            self.status.config(text="No data files available to export.")
-            return
-
         self.status.config(text=f"Exported: {', '.join(exported)}.")
 
     def load_card_thumbnail(self, card_name: str, max_w: int, max_h: int) -> tk.PhotoImage | None:
         img_path = CARDS_DIR / card_name
         cache_key = f"{img_path}:{max_w}x{max_h}"
-        if cache_key in self.card_images_cache:
-            return self.card_images_cache[cache_key]
+        cached = self.card_images_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        img: tk.PhotoImage | None = None
-        try:
-            from PIL import Image, ImageTk  # type: ignore
+        decoded = decode_card_thumbnail(self.thumb_cache, img_path, max_w, max_h)
+        img = self.photo_from_decoded(img_path, max_w, max_h, decoded)
+        if img is not None:
+            self.card_images_cache.put(cache_key, img)
+        return img
 
-            with Image.open(img_path) as pil_img:
-                pil_copy = pil_img.copy()
-                pil_copy.thumbnail((max_w, max_h))
-            img = ImageTk.PhotoImage(pil_copy)
-        except Exception:
+    def photo_from_decoded(
+        self, img_path: Path, max_w: int, max_h: int, decoded: tuple[str, object]
+    ) -> tk.PhotoImage | None:
+        kind, value = decoded
+        if kind == "file":
             try:
-                raw = tk.PhotoImage(file=str(img_path))
-                w = max(1, raw.width())
-                h = max(1, raw.height())
-                sx = max(1, math.ceil(w / max_w))
-                sy = max(1, math.ceil(h / max_h))
-                img = raw.subsample(sx, sy)
+                return tk.PhotoImage(file=str(value))
             except tk.TclError:
-                img = None
+                disk_key = self.thumb_cache.key_for(img_path, max_w, max_h)
+                if disk_key is not None:
+                    self.thumb_cache.discard(disk_key)
+                decoded = decode_card_thumbnail(self.thumb_cache, img_path, max_w, max_h)
+                kind, value = decoded
+        if kind == "pil":
+            try:
+                from PIL import ImageTk  # type: ignore
 
-        if img is not None:
-            self.card_images_cache[cache_key] = img
+                return ImageTk.PhotoImage(value)
+            except Exception:
+                pass
+
+        try:
+            raw = tk.PhotoImage(file=str(img_path))
+            w = max(1, raw.width())
+            h = max(1, raw.height())
+            sx = max(1, math.ceil(w / max_w))
+            sy = max(1, math.ceil(h / max_h))
+            img = raw.subsample(sx, sy)
+        except tk.TclError:
+            return None
+        disk_key = self.thumb_cache.key_for(img_path, max_w, max_h)
+        if disk_key is not None:
+            self.thumb_cache.store(
+                disk_key, img_path, max_w, max_h, (img.width(), img.height()), lambda out: img.write(out, format="png")
+            )
         return img
 
+    def card_thumb_size(self, card_name: str, max_w: int, max_h: int) -> tuple[int, int] | None:
+        # Size of the thumbnail before it is decoded, so placeholders already take the card's final space.
+        img_path = CARDS_DIR / card_name
+        cache_key = f"{img_path}:{max_w}x{max_h}"
+        if cache_key in self.card_thumb_sizes:
+            return self.card_thumb_sizes[cache_key]
+        disk_key = self.thumb_cache.key_for(img_path, max_w, max_h)
+        size = self.thumb_cache.thumb_size(disk_key) if disk_key is not None else None
+        if size is None:
+            full_size = read_image_size(img_path)
+            if full_size is not None:
+                size = fit_thumbnail_size(full_size[0], full_size[1], max_w, max_h)
+        if size is not None:
+            self.card_thumb_sizes[cache_key] = size
+        return size
+
+    def show_card_thumbnail(self, holder: tk.Canvas, cache_key: str, img: tk.PhotoImage) -> None:
+        holder.delete("all")
+        holder.config(width=img.width(), height=img.height(), bg="#fffdf4")
+        holder.create_image(0, 0, anchor="nw", image=img)
+        holder.image = img
+        self.card_images_cache.pin(cache_key, holder)
+
+    def library_view_range(self) -> tuple[float, float]:
+        canvas = self.library_canvas
+        if canvas is None or not canvas.winfo_exists():
+            return 0.0, 620.0
+        top = canvas.canvasy(0)
+        height = canvas.winfo_height()
+        return top, top + (height if height > 1 else 620)
+
+    def prioritize_library_thumbnails(self) -> None:
+        top, bottom = self.library_view_range()
+        self.library_view_top = top
+        for key, (card_name, y) in self.library_thumb_targets.items():
+            self.submit_library_thumbnail(key, card_name, y, top, bottom)
+
+    def submit_library_thumbnail(self, key: str, card_name: str, y: int, top: float, bottom: float) -> None:
+        # Cards overlapping the viewport go first, the rest by distance from it.
+        if top - LIBRARY_THUMB_HEIGHT <= y <= bottom:
+            priority = 0.0
+        else:
+            priority = min(abs(y - top), abs(y - bottom))
+        self.thumb_loader.submit(priority, key, CARDS_DIR / card_name, LIBRARY_THUMB_WIDTH, LIBRARY_THUMB_HEIGHT)
+
+    def poll_library_thumbnails(self) -> None:
+        self.library_thumb_job = None
+        # Bound the work per tick: Tk-only images (no Pillow) are decoded here, on the UI thread.
+        deadline = time.perf_counter() + 0.03
+        while time.perf_counter() < deadline:
+            try:
+                key, img_path, max_w, max_h, decoded = self.thumb_loader.results.get_nowait()
+            except queue.Empty:
+                break
+            target = self.library_thumb_targets.pop(key, None)
+            if target is None and decoded[0] == "tk":
+                continue
+            # A thumbnail decoded twice (e.g. across a re-render) is already cached; don't count that as a miss.
+            img = self.card_images_cache.get(key) if key in self.card_images_cache else None
+            if img is None:
+                img = self.photo_from_decoded(img_path, max_w, max_h, decoded)
+                if img is not None:
+                    self.card_images_cache.put(key, img)
+            index = self.library_key_index.get(key) if target is not None else None
+            if index is None:
+                continue
+            card_name, owned, size = self.library_cards[index]
+            if img is None:
+                self.card_thumb_failed.add(key)
+            elif (img.width(), img.height()) != size:
+                # The placeholder was a guess (no size known up front); the masonry has to move around it.
+                self.library_cards[index] = (card_name, owned, (img.width(), img.height()))
+                self.library_relayout_needed = True
+            slot = self.library_slots.get(index)
+            if slot is None:
+                continue
+            if img is not None:
+                self.show_card_thumbnail(slot.holder, key, img)
+            else:
+                slot.show_placeholder(size, "#f8f1ce", "Preview unavailable", "#6a613f")
+
+        if self.library_relayout_needed:
+            self.layout_library_cards()
+        if not self.library_thumb_targets:
+            self.thumb_cache.save()
+            return
+        if self.library_view_range()[0] != self.library_view_top:
+            self.prioritize_library_thumbnails()
+        self.library_thumb_job = self.root.after(50, self.poll_library_thumbnails)
+
+    def cancel_library_thumbnails(self) -> None:
+        if self.library_thumb_job is not None:
+            self.root.after_cancel(self.library_thumb_job)
+            self.library_thumb_job = None
+        self.thumb_loader.cancel()
+        self.library_thumb_targets.clear()
+        self.thumb_cache.save()
+
     def refresh_library_summary(self) -> None:
         if self.library_count_label is None or not self.library_count_label.winfo_exists():
             return
@@ -1153,21 +4295,48 @@ class FloatingTaskWidget:
         self.library_count_label.config(text=f"Collected {owned} / {total}")
 
     def render_library_cards(self) -> None:
-        if self.library_items_frame is None or not self.library_items_frame.winfo_exists():
+        canvas = self.library_canvas
+        if canvas is None or not canvas.winfo_exists():
             return
 
-        frame = self.library_items_frame
-        for child in frame.winfo_children():
-            child.destroy()
+        self.cancel_library_thumbnails()
+        self.card_thumb_failed.clear()
+        # Card indices change with the pool, so no slot can stay bound across a re-render.
+        for slot in self.library_slots.values():
+            slot.hide()
+            self.library_free_slots.append(slot)
+        self.library_slots = {}
+        if self.library_hint is not None:
+            canvas.delete("hint")
+            self.library_hint.destroy()
+            self.library_hint = None
 
         pool = self.get_card_pool()
         unlocked_raw = self.card_state.get("unlocked", [])
         unlocked = {str(x) for x in unlocked_raw if str(x).strip()}
         ordered = sorted(pool, key=lambda x: (x not in unlocked, x.lower()))
 
+        # Thumbnail sizes come from memory, the disk cache index or the image header; nothing is decoded here.
+        self.library_cards = []
+        self.library_key_index = {}
+        for card_name in ordered:
+            owned = card_name in unlocked
+            size = (LIBRARY_THUMB_WIDTH, 140)
+            if owned:
+                cache_key = f"{CARDS_DIR / card_name}:{LIBRARY_THUMB_WIDTH}x{LIBRARY_THUMB_HEIGHT}"
+                self.library_key_index[cache_key] = len(self.library_cards)
+                thumb = self.card_images_cache.get(cache_key)
+                if thumb is not None:
+                    size = (thumb.width(), thumb.height())
+                else:
+                    size = self.card_thumb_size(card_name, LIBRARY_THUMB_WIDTH, LIBRARY_THUMB_HEIGHT) or size
+            self.library_cards.append((card_name, owned, size))
+        self.measure_library_names(canvas, ordered)
+
+        self.layout_library_cards()
         if not ordered:
-            hint = tk.Label(
-                frame,
+            self.library_hint = tk.Label(
+                canvas,
                 text=f"No card images yet.\nPut images into:\n{CARDS_DIR}",
                 bg="#f6f9ef",
                 fg="#5f6f52",
@@ -1175,128 +4344,118 @@ class FloatingTaskWidget:
                 padx=16,
                 pady=24,
             )
-            hint.grid(row=0, column=0, padx=12, pady=12, sticky="nsew")
-            self.refresh_library_summary()
-            return
+            canvas.create_window((12, 12), window=self.library_hint, anchor="nw", tags="hint")
+        self.refresh_library_summary()
 
-        viewport_w = frame.winfo_width()
-        if viewport_w <= 0:
+    def measure_library_names(self, canvas: tk.Canvas, card_names: list[str]) -> None:
+        # Cards get fixed heights in the masonry, so a name wrapping to several lines has to be known up front.
+        # An unmapped label configured like the slots' name label reports the wrapped height Tk would give it.
+        missing = [card_name for card_name in card_names if card_name not in self.library_name_heights]
+        if not missing:
+            return
+        probe = tk.Label(canvas, justify="left", font=LIBRARY_NAME_FONT, wraplength=LIBRARY_NAME_WRAP, text="X")
+        one_line = probe.winfo_reqheight()
+        for card_name in missing:
+            probe.config(text=card_name)
+            self.library_name_heights[card_name] = max(0, probe.winfo_reqheight() - one_line)
+        probe.destroy()
+
+    def layout_library_cards(self) -> None:
+        canvas = self.library_canvas
+        if canvas is None or not canvas.winfo_exists():
+            return
+        self.library_relayout_needed = False
+        viewport_w = canvas.winfo_width()
+        if viewport_w <= 1:
             viewport_w = 860
-        if viewport_w >= 1180:
-            columns = 4
-        elif viewport_w >= 820:
-            columns = 3
-        else:
-            columns = 2
-
-        column_frames: list[tk.Frame] = []
-        column_heights = [0 for _ in range(columns)]
-        for i in range(columns):
-            frame.grid_columnconfigure(i, weight=1, uniform="libcol")
-            col = tk.Frame(frame, bg="#f6f9ef")
-            col.grid(row=0, column=i, sticky="n", padx=6)
-            column_frames.append(col)
-
-        thumb_w = 220
-
-        for idx, card_name in enumerate(ordered):
-            owned = card_name in unlocked
-
-            target_col = min(range(columns), key=lambda i: column_heights[i])
-            parent_col = column_frames[target_col]
-            card = tk.Frame(
-                parent_col,
-                bg=("#fffdf4" if owned else "#ececec"),
-                highlightthickness=1,
-                highlightbackground=("#e7d78f" if owned else "#d4d4d4"),
-                bd=0,
-                padx=8,
-                pady=8,
-                cursor=("hand2" if owned else "arrow"),
-            )
-            card.pack(fill="x", pady=8)
-
-            if owned:
-                # Keep original aspect ratio to create a Pinterest-like masonry wall.
-                thumb = self.load_card_thumbnail(card_name, thumb_w, 360)
-            else:
-                thumb = None
-
-            if thumb is not None and owned:
-                img_label = tk.Label(card, image=thumb, bg="#fffdf4")
-                img_label.image = thumb
-                img_label.pack(anchor="center")
-                preview_h = max(120, thumb.height())
-            else:
-                placeholder = tk.Canvas(
-                    card,
-                    width=thumb_w,
-                    height=140,
-                    bg=("#f8f1ce" if owned else "#d7d7d7"),
-                    highlightthickness=0,
-                    bd=0,
-                )
-                placeholder.create_text(
-                    100,
-                    65,
-                    text=("Preview unavailable" if owned else "Locked"),
-                    fill=("#6a613f" if owned else "#777777"),
-                    font=("TkDefaultFont", 11, "bold"),
-                )
-                placeholder.pack(anchor="center")
-                preview_h = 140
-
-            name_label = tk.Label(
-                card,
-                text=card_name,
-                bg=("#fffdf4" if owned else "#ececec"),
-                fg=("#3f4f63" if owned else "#777777"),
-                anchor="w",
-                wraplength=thumb_w - 10,
-                justify="left",
-                font=("TkDefaultFont", 10, "bold"),
-            )
-            name_label.pack(fill="x", pady=(8, 2))
-
-            state_label = tk.Label(
-                card,
-                text=("Collected" if owned else "Not collected"),
-                bg=("#f8edbd" if owned else "#dedede"),
-                fg=("#5a4f1c" if owned else "#666666"),
-                padx=6,
-                pady=2,
-                font=("TkDefaultFont", 9),
-            )
-            state_label.pack(anchor="w")
-
-            column_heights[target_col] += preview_h + 88
-
-            if owned:
-                hover_bg = "#f9f2d5"
-                normal_bg = "#fffdf4"
+        columns = library_column_count(viewport_w)
+        column_w = (viewport_w - 12) / columns
 
-                def on_enter(_event: object, c=card, n=name_label) -> None:
-                    c.config(bg=hover_bg, highlightbackground="#d8c270")
-                    n.config(bg=hover_bg)
-
-                def on_leave(_event: object, c=card, n=name_label) -> None:
-                    c.config(bg=normal_bg, highlightbackground="#e7d78f")
-                    n.config(bg=normal_bg)
-
-                def on_click(_event: object, name=card_name) -> None:
-                    self.open_card_preview(name)
-
-                bind_widgets: list[tk.Widget] = [card, name_label, state_label]
-                if thumb is not None:
-                    bind_widgets.append(img_label)
-                else:
-                    bind_widgets.append(placeholder)
-                for widget in bind_widgets:
-                    widget.bind("<Enter>", on_enter)
-                    widget.bind("<Leave>", on_leave)
-                    widget.bind("<Button-1>", on_click)
-
-        self.refresh_library_summary()
+        heights = [
+            max(120, size[1]) + LIBRARY_CARD_CHROME + self.library_name_heights.get(card_name, 0)
+            for card_name, _owned, size in self.library_cards
+        ]
+        positions, column_heights = masonry_layout(heights, columns, LIBRARY_CARD_GAP)
+        self.library_boxes = []
+        self.library_column_cards = [[] for _ in range(columns)]
+        self.library_column_bottoms = [[] for _ in range(columns)]
+        for index, ((column, y), height) in enumerate(zip(positions, heights)):
+            top = y + LIBRARY_CARD_GAP
+            self.library_boxes.append((12 + column * column_w, top, column_w - 12, height))
+            self.library_column_cards[column].append(index)
+            self.library_column_bottoms[column].append(top + height)
+        self.library_layout_width = viewport_w
+        self.library_layout_columns = columns
+        self.library_content_height = max(column_heights) + LIBRARY_CARD_GAP
+        canvas.configure(scrollregion=(0, 0, viewport_w, self.library_content_height))
+        # Slots that stay in range keep their widgets and images and are only moved to their new box.
+        self.update_library_viewport(replace=True)
+
+    def reflow_library_cards(self) -> None:
+        self.library_reflow_job = None
+        canvas = self.library_canvas
+        if canvas is None or not canvas.winfo_exists():
+            return
+        viewport_w = canvas.winfo_width()
+        if viewport_w <= 1:
+            return
+        if library_column_count(viewport_w) != self.library_layout_columns:
+            self.layout_library_cards()
+            return
+        if viewport_w != self.library_layout_width:
+            # Same columns, only wider or narrower: every card keeps its column and y, just x and width change.
+            self.library_layout_width = viewport_w
+            column_w = (viewport_w - 12) / self.library_layout_columns
+            for column, cards in enumerate(self.library_column_cards):
+                for index in cards:
+                    _x, y, _w, height = self.library_boxes[index]
+                    self.library_boxes[index] = (12 + column * column_w, y, column_w - 12, height)
+            canvas.configure(scrollregion=(0, 0, viewport_w, self.library_content_height))
+            for index, slot in self.library_slots.items():
+                slot.place(*self.library_boxes[index])
+        self.update_library_viewport()
+
+    def update_library_viewport(self, replace: bool = False) -> None:
+        canvas = self.library_canvas
+        if canvas is None or not canvas.winfo_exists():
+            return
+        top, bottom = self.library_view_range()
+        # Half a screen of cards above and below the viewport is kept live so scrolling does not show gaps.
+        margin = (bottom - top) / 2
+        wanted: set[int] = set()
+        for cards, bottoms in zip(self.library_column_cards, self.library_column_bottoms):
+            for pos in range(bisect.bisect_right(bottoms, top - margin), len(cards)):
+                index = cards[pos]
+                if self.library_boxes[index][1] > bottom + margin:
+                    break
+                wanted.add(index)
+
+        for index in [i for i in self.library_slots if i not in wanted]:
+            slot = self.library_slots.pop(index)
+            slot.hide()
+            self.library_free_slots.append(slot)
+        if replace:
+            for index, slot in self.library_slots.items():
+                slot.place(*self.library_boxes[index])
+
+        for index in sorted(wanted - self.library_slots.keys()):
+            card_name, owned, size = self.library_cards[index]
+            slot = self.library_free_slots.pop() if self.library_free_slots else LibraryCardSlot(self, canvas)
+            cache_key = f"{CARDS_DIR / card_name}:{LIBRARY_THUMB_WIDTH}x{LIBRARY_THUMB_HEIGHT}"
+            thumb = self.card_images_cache.get(cache_key) if owned else None
+            slot.bind(card_name, owned, size, thumb)
+            if owned and cache_key in self.card_thumb_failed:
+                slot.show_placeholder(size, "#f8f1ce", "Preview unavailable", "#6a613f")
+            elif owned and thumb is None and cache_key not in self.library_thumb_targets:
+                y = self.library_boxes[index][1]
+                self.library_thumb_targets[cache_key] = (card_name, y)
+                self.submit_library_thumbnail(cache_key, card_name, y, top, bottom)
+            slot.place(*self.library_boxes[index])
+            self.library_slots[index] = slot
+
+        if self.library_thumb_targets and self.library_thumb_job is None:
+            self.library_view_top = top
+            self.library_thumb_job = self.root.after(50, self.poll_library_thumbnails)
 
     def open_card_preview(self, card_name: str) -> None:
         self.close_preview_window()
@@ -1311,9 +4470,12 @@ class FloatingTaskWidget:
         body.pack(fill="both", expand=True)
 
         img = self.load_card_thumbnail(card_name, 560, 400)
+        self.thumb_cache.save()
         if img is not None:
             img_label = tk.Label(body, image=img, bg="#131f30")
             img_label.image = img
+            img_label.bind("<Destroy>", lambda _event: self.card_images_cache.release(img_label), add="+")
+            self.card_images_cache.pin(f"{CARDS_DIR / card_name}:560x400", img_label)
             img_label.pack(fill="both", expand=True)
         else:
             fallback = tk.Label(
@@ -1360,6 +4522,8 @@ class FloatingTaskWidget:
             self.render_library_cards()
             return
 
+        # Drop thumbnails of cards that were edited or removed since the last visit.
+        self.thumb_cache.prune()
         win = tk.Toplevel(self.root)
         win.title("Card Library")
         win.geometry("860x620")
@@ -1414,23 +4578,19 @@ class FloatingTaskWidget:
 
         canvas = tk.Canvas(body, bg="#f6f9ef", highlightthickness=0, bd=0)
         scrollbar = tk.Scrollbar(body, orient="vertical", command=canvas.yview)
-        canvas.configure(yscrollcommand=scrollbar.set)
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
+        self.library_canvas = canvas
+        self.library_slots = {}
+        self.library_free_slots = []
 
-        items_frame = tk.Frame(canvas, bg="#f6f9ef")
-        canvas_window = canvas.create_window((0, 0), window=items_frame, anchor="nw")
-        self.library_items_frame = items_frame
-
-        def _on_items_configure(_event: object = None) -> None:
-            canvas.configure(scrollregion=canvas.bbox("all"))
-
-        def _on_canvas_configure(event: tk.Event) -> None:
-            canvas.itemconfigure(canvas_window, width=event.width)
+        # Cards are canvas window items at precomputed masonry positions; scrolling only rebinds slots.
+        def _on_library_yview(first: str, last: str) -> None:
+            scrollbar.set(first, last)
+            self.update_library_viewport()
 
-        items_frame.bind("<Configure>", _on_items_configure)
-        canvas.bind("<Configure>", _on_canvas_configure)
-        canvas.bind("<Configure>", self._schedule_library_reflow, add="+")
+        canvas.configure(yscrollcommand=_on_library_yview)
+        canvas.bind("<Configure>", self._schedule_library_reflow)
 
         self.render_library_cards()
         win.protocol("WM_DELETE_WINDOW", self._on_close_library_window)
@@ -1438,25 +4598,53 @@ class FloatingTaskWidget:
     def _schedule_library_reflow(self, _event: object = None) -> None:
         if self.library_reflow_job is not None:
             self.root.after_cancel(self.library_reflow_job)
-        self.library_reflow_job = self.root.after(120, self.render_library_cards)
+        self.library_reflow_job = self.root.after(120, self.reflow_library_cards)
 
     def _on_close_library_window(self) -> None:
         if self.library_reflow_job is not None:
             self.root.after_cancel(self.library_reflow_job)
             self.library_reflow_job = None
+        self.cancel_library_thumbnails()
         self.close_preview_window()
         if self.library_window is not None and self.library_window.winfo_exists():
             self.library_window.destroy()
         self.library_window = None
-        self.library_items_frame = None
+        self.library_canvas = None
+        self.library_hint = None
+        self.library_slots = {}
+        self.library_free_slots = []
         self.library_count_label = None
 
+    def history_summary_text(self) -> str:
+        today = datetime.now().date()
+        today_key = today.isoformat()
+        week_key = (today - timedelta(days=today.weekday())).isoformat()
+        month_key = today.replace(day=1).isoformat()
+        last30_key = (today - timedelta(days=29)).isoformat()
+        analytics = self.get_analytics()
+        return "\n".join(
+            [
+                f"Streak: {analytics.current_streak(today_key)} ★ days (best {analytics.longest_streak})"
+                f" · ★ days: {analytics.goal_days()}",
+                f"This week: {self.format_seconds(analytics.range_total(week_key, today_key))}"
+                f" · This month: {self.format_seconds(analytics.range_total(month_key, today_key))}"
+                f" · 30-day avg: {self.format_seconds(analytics.average(last30_key, today_key))}/day",
+            ]
+        )
+
     def open_history_window(self) -> None:
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.lift()
+            self.history_window.focus_force()
+            self.reload_history_window()
+            return
+
         win = tk.Toplevel(self.root)
         win.title("Time History")
         win.geometry("560x420")
         win.minsize(480, 320)
         win.configure(bg=self.bg)
+        self.history_window = win
 
         wrap = tk.Frame(win, padx=10, pady=10, bg=self.bg)
         wrap.pack(fill="both", expand=True)
@@ -1467,11 +4655,20 @@ class FloatingTaskWidget:
             font=("TkDefaultFont", 13, "bold"),
             bg=self.bg,
             fg=self.text,
-        ).pack(anchor="w", pady=(0, 8))
+        ).pack(anchor="w", pady=(0, 2))
+        self.history_summary_label = tk.Label(
+            wrap,
+            bg=self.bg,
+            fg=self.muted,
+            anchor="w",
+            justify="left",
+        )
+        self.history_summary_label.pack(fill="x", pady=(0, 8))
 
         body = tk.Frame(wrap, bg=self.bg)
         body.pack(fill="both", expand=True)
 
+        date_scroll = tk.Scrollbar(body, orient="vertical")
         date_list = tk.Listbox(
             body,
             exportselection=False,
@@ -1480,8 +4677,12 @@ class FloatingTaskWidget:
             highlightthickness=1,
             highlightbackground=self.line,
             relief="flat",
+            yscrollcommand=lambda first, last: self.on_history_list_scroll(date_scroll, first, last),
         )
+        date_scroll.config(command=date_list.yview)
         date_list.pack(side="left", fill="y")
+        date_scroll.pack(side="left", fill="y")
+        self.history_list = date_list
 
         details = tk.Text(
             body,
@@ -1494,148 +4695,306 @@ class FloatingTaskWidget:
         )
         details.pack(side="left", fill="both", expand=True, padx=(8, 0))
         details.config(state="disabled")
+        self.history_details = details
 
-        sorted_dates = sorted(self.history.keys(), reverse=True)
-        if not sorted_dates:
-            details.config(state="normal")
-            details.insert("1.0", "No history yet.\nStart a task and pause/complete it to generate records.")
-            details.config(state="disabled")
+        footer = tk.Frame(wrap, bg=self.bg)
+        footer.pack(fill="x", pady=(8, 0))
+        tk.Button(
+            footer,
+            text="By Task",
+            command=self.open_task_drilldown_window,
+            relief="flat",
+            bd=0,
+            padx=10,
+            bg=self.soft_blue,
+            fg=self.text,
+            activebackground="#ccdce8",
+        ).pack(side="right")
+        tk.Button(
+            footer,
+            text="By Hour",
+            command=self.open_hour_profile_window,
+            relief="flat",
+            bd=0,
+            padx=10,
+            bg=self.soft_green,
+            fg=self.text,
+            activebackground="#d2e3d8",
+        ).pack(side="right", padx=(0, 6))
+
+        date_list.bind("<<ListboxSelect>>", lambda _event: self.show_history_day())
+        win.protocol("WM_DELETE_WINDOW", self.close_history_window)
+        self.reload_history_window()
+
+    def close_history_window(self) -> None:
+        if self.history_page_job is not None:
+            self.root.after_cancel(self.history_page_job)
+            self.history_page_job = None
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.destroy()
+        self.history_window = None
+        self.history_summary_label = None
+        self.history_list = None
+        self.history_details = None
+        self.history_dates = []
+
+    def reload_history_window(self) -> None:
+        if self.history_list is None or self.history_summary_label is None:
             return
+        self.history_summary_label.config(text=self.history_summary_text())
+        self.history_list.delete(0, "end")
+        self.history_dates = []
+        self.history_exhausted = False
+        self.load_history_page()
+        if not self.history_dates:
+            self.set_history_details("No history yet.\nStart a task and pause/complete it to generate records.")
+            return
+        self.history_list.selection_set(0)
+        self.show_history_day()
 
-        display_dates: list[str] = []
-        for d in sorted_dates:
-            total_seconds = float(self.history.get(d, {}).get("total_seconds", 0.0))
+    def load_history_page(self) -> None:
+        self.history_page_job = None
+        if self.history_list is None or self.history_exhausted:
+            return
+        page = self.storage.day_totals(offset=len(self.history_dates), limit=HISTORY_PAGE_SIZE)
+        if len(page) < HISTORY_PAGE_SIZE:
+            self.history_exhausted = True
+        for d, total_seconds in page:
             reached = total_seconds >= DAILY_GOAL_SECONDS
-            date_list.insert("end", f"{d} {'★' if reached else ''}".rstrip())
-            display_dates.append(d)
+            self.history_list.insert("end", f"{d} {'★' if reached else ''}".rstrip())
+            self.history_dates.append(d)
+
+    def on_history_list_scroll(self, scrollbar: tk.Scrollbar, first: str, last: str) -> None:
+        scrollbar.set(first, last)
+        # Fetch the next page once the visible part reaches the last quarter of what has been loaded so far.
+        if not self.history_exhausted and self.history_page_job is None and float(last) >= 0.75:
+            self.history_page_job = self.root.after_idle(self.load_history_page)
+
+    def show_history_day(self) -> None:
+        if self.history_list is None:
+            return
+        sel = self.history_list.curselection()
+        if not sel or sel[0] >= len(self.history_dates):
+            return
+        date_key = self.history_dates[sel[0]]
+        day = self.storage.day_record(date_key)
+        total_seconds = float(day.get("total_seconds", 0.0))
+        tasks = day.get("tasks", {})
+        reached = total_seconds >= DAILY_GOAL_SECONDS
+
+        lines = [
+            f"Date: {date_key}",
+            f"Total: {self.format_seconds(total_seconds)}",
+            f"Goal 6.5h: {'Reached ★' if reached else 'Not reached'}",
+            "",
+            "Task Breakdown:",
+        ]
+        if isinstance(tasks, dict) and tasks:
+            for task_name, sec in sorted(tasks.items(), key=lambda x: float(x[1]), reverse=True):
+                lines.append(f"- {task_name}: {self.format_seconds(float(sec))}")
+        else:
+            lines.append("- No data")
+        self.set_history_details("\n".join(lines))
+
+    def open_task_drilldown_window(self) -> None:
+        if self.history_window is None or not self.history_window.winfo_exists():
+            return
+        names = self.storage.task_names()
+
+        win = tk.Toplevel(self.history_window)
+        win.title("Time by Task")
+        win.geometry("620x420")
+        win.minsize(480, 320)
+        win.configure(bg=self.bg)
+
+        wrap = tk.Frame(win, padx=10, pady=10, bg=self.bg)
+        wrap.pack(fill="both", expand=True)
+
+        body = tk.Frame(wrap, bg=self.bg)
+        body.pack(fill="both", expand=True)
+
+        name_scroll = tk.Scrollbar(body, orient="vertical")
+        name_list = tk.Listbox(
+            body,
+            exportselection=False,
+            bg=self.panel,
+            fg=self.text,
+            highlightthickness=1,
+            highlightbackground=self.line,
+            relief="flat",
+            width=26,
+            yscrollcommand=name_scroll.set,
+        )
+        name_scroll.config(command=name_list.yview)
+        name_list.pack(side="left", fill="y")
+        name_scroll.pack(side="left", fill="y")
+
+        details = tk.Text(
+            body,
+            wrap="word",
+            bg=self.panel,
+            fg=self.text,
+            relief="flat",
+            highlightthickness=1,
+            highlightbackground=self.line,
+        )
+        details.pack(side="left", fill="both", expand=True, padx=(8, 0))
+
+        if not names:
+            details.insert("1.0", "No history yet.")
+            details.config(state="disabled")
+            return
+        for name in names:
+            name_list.insert("end", name)
 
         def show_selected(_event: object = None) -> None:
-            sel = date_list.curselection()
+            sel = name_list.curselection()
             if not sel:
                 return
-            date_key = display_dates[sel[0]]
-            day = self.history.get(date_key, {})
-            total_seconds = float(day.get("total_seconds", 0.0))
-            tasks = day.get("tasks", {})
-            reached = total_seconds >= DAILY_GOAL_SECONDS
-
+            task_name = names[sel[0]]
+            summary = self.storage.task_summary(task_name)
+            series = summary["series"] if isinstance(summary["series"], list) else []
+            total_seconds = float(summary["total_seconds"])
+            day_count = int(summary["days"])
             lines = [
-                f"Date: {date_key}",
-                f"Total: {self.format_seconds(total_seconds)}",
-                f"Goal 6.5h: {'Reached ★' if reached else 'Not reached'}",
+                f"Task: {task_name}",
+                f"Total: {self.format_seconds(total_seconds)} over {day_count} day{'s' if day_count != 1 else ''}",
+                f"Average per active day: {self.format_seconds(total_seconds / day_count if day_count else 0.0)}",
+                f"First day: {summary['first_day'] or '-'}",
+                f"Last day: {summary['last_day'] or '-'}",
                 "",
-                "Task Breakdown:",
+                "Daily:",
             ]
-            if isinstance(tasks, dict) and tasks:
-                for task_name, sec in sorted(tasks.items(), key=lambda x: float(x[1]), reverse=True):
-                    lines.append(f"- {task_name}: {self.format_seconds(float(sec))}")
-            else:
-                lines.append("- No data")
+            for date_key, seconds in reversed(series):
+                lines.append(f"- {date_key}: {self.format_seconds(seconds)}")
 
             details.config(state="normal")
             details.delete("1.0", "end")
             details.insert("1.0", "\n".join(lines))
             details.config(state="disabled")
 
-        date_list.bind("<<ListboxSelect>>", show_selected)
-        date_list.selection_set(0)
+        name_list.bind("<<ListboxSelect>>", show_selected)
+        name_list.selection_set(0)
         show_selected()
 
-    def render_tasks(self) -> None:
-        for child in self.list_container.winfo_children():
-            child.destroy()
-        self.task_time_labels = {}
-
-        if not self.tasks:
-            empty = tk.Label(self.list_container, text="No tasks yet.", bg=self.panel, fg=self.muted)
-            empty.pack(anchor="w", padx=10, pady=10)
-            self._on_task_frame_configure()
-            self.refresh_timer_labels()
+    def open_hour_profile_window(self) -> None:
+        if self.history_window is None or not self.history_window.winfo_exists():
             return
+        profile = self.hour_of_day_profile(HOUR_PROFILE_DAYS)
 
-        visible_indices = [i for i, task in enumerate(self.tasks) if self.show_completed or not bool(task["done"])]
-        if not visible_indices:
-            empty = tk.Label(self.list_container, text="No visible tasks.", bg=self.panel, fg=self.muted)
-            empty.pack(anchor="w", padx=10, pady=10)
-            self._on_task_frame_configure()
-            self.refresh_timer_labels()
-            return
-
-        for pos, idx in enumerate(visible_indices):
-            task = self.tasks[idx]
-            task_id = str(task.get("id", ""))
-            row = tk.Frame(self.list_container, bg=self.panel, padx=8, pady=6)
-            row.pack(fill="x")
-            row.grid_columnconfigure(1, weight=1)
-
-            done = bool(task["done"])
-            txt = str(task["text"])
-
-            mark = "[x]" if done else "[ ]"
-            toggle_btn = tk.Button(
-                row,
-                text=mark,
-                width=3,
-                command=lambda i=idx: self.toggle_task(i),
-                relief="flat",
-                bd=0,
-                bg=self.soft_blue,
-                fg=self.text,
-                activebackground="#cfdeea",
-            )
-            toggle_btn.grid(row=0, column=0, sticky="nw", rowspan=2)
-
-            label = tk.Label(
-                row,
-                text=txt,
-                bg=self.panel,
-                fg=(self.muted if done else self.text),
-                font=(self.done_font if done else self.default_font),
-                anchor="w",
-                cursor="hand2",
-            )
-            label.grid(row=0, column=1, sticky="ew", padx=(8, 8))
-            label.bind("<Button-1>", lambda _event, t_id=task_id: self.open_task_note_window(t_id))
-
-            timer_label = tk.Label(row, text="", bg=self.panel, fg=self.muted, anchor="w", font=("TkDefaultFont", 10))
-            timer_label.grid(row=1, column=1, sticky="w", padx=(8, 8))
-            self.task_time_labels[idx] = timer_label
-
-            run_btn_text = "Pause" if bool(task.get("running", False)) else "Start"
-            run_btn = tk.Button(
-                row,
-                text=run_btn_text,
-                command=lambda i=idx: self.toggle_run_task(i),
-                width=6,
-                relief="flat",
-                bd=0,
-                bg=(self.soft_rose if done else self.soft_green),
-                fg=self.text,
-            )
-            run_btn.grid(row=0, column=2, padx=(4, 4), sticky="ne", rowspan=2)
-            if done:
-                run_btn.config(state="disabled")
-
-            del_btn = tk.Button(
-                row,
-                text="Del",
-                command=lambda i=idx: self.delete_task(i),
-                relief="flat",
-                bd=0,
-                bg=self.soft_rose,
-                fg=self.text,
-                activebackground="#e8d5d8",
+        win = tk.Toplevel(self.history_window)
+        win.title("Time by Hour of Day")
+        win.geometry("620x320")
+        win.minsize(480, 260)
+        win.configure(bg=self.bg)
+
+        wrap = tk.Frame(win, padx=10, pady=10, bg=self.bg)
+        wrap.pack(fill="both", expand=True)
+        tk.Label(
+            wrap,
+            text=f"Average time per hour, last {HOUR_PROFILE_DAYS} days",
+            font=("TkDefaultFont", 12, "bold"),
+            bg=self.bg,
+            fg=self.text,
+        ).pack(anchor="w", pady=(0, 8))
+
+        canvas = tk.Canvas(wrap, bg=self.panel, highlightthickness=1, highlightbackground=self.line)
+        canvas.pack(fill="both", expand=True)
+
+        def draw(_event: object = None) -> None:
+            canvas.delete("all")
+            width = max(1, canvas.winfo_width())
+            height = max(1, canvas.winfo_height())
+            top, bottom, side = 16, 22, 10
+            slot = (width - 2 * side) / 24
+            peak = max(max(profile), 60.0)
+            for hour, seconds in enumerate(profile):
+                x0 = side + hour * slot + 2
+                x1 = side + (hour + 1) * slot - 2
+                bar_h = (height - top - bottom) * seconds / peak
+                canvas.create_rectangle(x0, height - bottom - bar_h, x1, height - bottom, fill=self.accent, outline="")
+                if hour % 3 == 0:
+                    canvas.create_text(x0, height - bottom + 4, text=f"{hour:02d}", anchor="nw", fill=self.muted)
+            peak_hour = max(range(24), key=lambda h: profile[h])
+            canvas.create_text(
+                side,
+                2,
+                text=f"Peak {peak_hour:02d}:00 · {int(profile[peak_hour] // 60)} min/day",
+                anchor="nw",
+                fill=self.muted,
             )
-            del_btn.grid(row=0, column=3, sticky="ne", rowspan=2)
 
-            if pos < len(visible_indices) - 1:
-                tk.Frame(self.list_container, bg=self.line, height=1).pack(fill="x", padx=8)
+        canvas.bind("<Configure>", draw)
+
+    def set_history_details(self, text: str) -> None:
+        if self.history_details is None:
+            return
+        self.history_details.config(state="normal")
+        self.history_details.delete("1.0", "end")
+        self.history_details.insert("1.0", text)
+        self.history_details.config(state="disabled")
+
+    def render_tasks(self) -> None:
+        visible = [task for task in self.tasks if self.show_completed or not task.done]
+        if len(visible) > VIRTUAL_LIST_THRESHOLD:
+            self._render_virtual_tasks(visible)
+            return
+        if self.virtual_list_active:
+            self._leave_virtual_list()
+
+        wanted_ids = [task.id for task in visible]
+        wanted = set(wanted_ids)
+
+        for task_id in [task_id for task_id in self.task_rows if task_id not in wanted]:
+            self.task_rows.pop(task_id).destroy()
+
+        if not visible:
+            empty_text = "No tasks yet." if not self.tasks else "No visible tasks."
+            if self.task_empty_label is None:
+                self.task_empty_label = tk.Label(self.list_container, text=empty_text, bg=self.panel, fg=self.muted)
+                self.task_empty_label.pack(anchor="w", padx=10, pady=10)
+            else:
+                self.task_empty_label.config(text=empty_text)
+            self.task_row_order = []
+            self._on_task_frame_configure()
+            self.refresh_all_timer_labels()
+            return
+        if self.task_empty_label is not None:
+            self.task_empty_label.destroy()
+            self.task_empty_label = None
+
+        for task in visible:
+            task_id = task.id
+            row = self.task_rows.get(task_id)
+            if row is None:
+                row = TaskRow(self, self.list_container)
+                self.task_rows[task_id] = row
+            row.bind(task)
+
+        # Rows that survived keep their relative order unless tasks were reordered, so usually only the
+        # newly created tail needs packing; everything from the first out-of-place row onward is re-packed.
+        survivors = [task_id for task_id in self.task_row_order if task_id in wanted]
+        first_moved = 0
+        while (
+            first_moved < len(survivors)
+            and first_moved < len(wanted_ids)
+            and survivors[first_moved] == wanted_ids[first_moved]
+        ):
+            first_moved += 1
+        for task_id in wanted_ids[first_moved:]:
+            self.task_rows[task_id].pack_at_end()
+        last_pos = len(wanted_ids) - 1
+        for pos, task_id in enumerate(wanted_ids):
+            self.task_rows[task_id].show_separator(pos < last_pos)
+        self.task_row_order = wanted_ids
 
         self._on_task_frame_configure()
-        self.refresh_timer_labels()
+        self.refresh_all_timer_labels()
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["merge"]:
+        sys.exit(merge_main(sys.argv[2:]))
     root = tk.Tk()
     FloatingTaskWidget(root)
     root.mainloop()